@@ -0,0 +1,78 @@
+"""initial
+
+Revision ID: 0001_initial
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        id_type = sa.String(length=36)
+    else:
+        id_type = postgresql.UUID(as_uuid=True)
+
+    op.create_table(
+        'task',
+        sa.Column(
+            'name',
+            sa.String(length=256),
+            nullable=False,
+            comment='Название задачи',
+        ),
+        sa.Column(
+            'description',
+            sa.Text(),
+            nullable=False,
+            comment='Описание задачи',
+        ),
+        sa.Column(
+            'status',
+            sa.String(length=20),
+            server_default='Создано',
+            nullable=False,
+            comment='Статус выполнения задачи',
+        ),
+        sa.Column('id', id_type, nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(),
+            server_default=sa.text('CURRENT_TIMESTAMP'),
+            nullable=True,
+            comment='Дата создания',
+        ),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(),
+            server_default=sa.text('CURRENT_TIMESTAMP'),
+            nullable=True,
+            comment='Дата обновления',
+        ),
+        sa.CheckConstraint(
+            "status IN ('Создано', 'В работе', 'Завершено')",
+            name='check_status',
+        ),
+        sa.PrimaryKeyConstraint('id'),
+        #  Имя совпадает с именем, которое postgres дает ограничению
+        #  unique=True, чтобы ранее созданные БД можно было пометить
+        #  этой ревизией через `alembic stamp`.
+        sa.UniqueConstraint('name', name='task_name_key'),
+    )
+    op.create_index('ix_task_id', 'task', ['id'], unique=True)
+    op.create_index('ix_task_status', 'task', ['status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_task_status', table_name='task')
+    op.drop_index('ix_task_id', table_name='task')
+    op.drop_table('task')
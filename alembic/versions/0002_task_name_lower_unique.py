@@ -0,0 +1,37 @@
+"""case-insensitive unique task name
+
+Revision ID: 0002_task_name_lower_unique
+Revises: 0001_initial
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002_task_name_lower_unique'
+down_revision = '0001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #  batch-режим пересоздает таблицу на sqlite и выполняет обычный
+    #  ALTER TABLE на postgres.
+    with op.batch_alter_table('task') as batch_op:
+        batch_op.drop_constraint('task_name_key', type_='unique')
+
+    #  Функциональный индекс поддерживают и postgres, и sqlite.
+    op.create_index(
+        'ix_task_name_lower',
+        'task',
+        [sa.text('lower(name)')],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_task_name_lower', table_name='task')
+
+    with op.batch_alter_table('task') as batch_op:
+        batch_op.create_unique_constraint('task_name_key', ['name'])
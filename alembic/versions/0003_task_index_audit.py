@@ -0,0 +1,56 @@
+"""task index audit
+
+Revision ID: 0003_task_index_audit
+Revises: 0002_task_name_lower_unique
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0003_task_index_audit'
+down_revision = '0002_task_name_lower_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #  На postgres индексы строятся и удаляются CONCURRENTLY, чтобы не
+    #  блокировать запись в таблицу, а это возможно только вне транзакции.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_task_status_created_at_id',
+            'task',
+            ['status', 'created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+        #  ix_task_status покрывается префиксом составного индекса,
+        #  ix_task_id дублирует индекс первичного ключа.
+        op.drop_index(
+            'ix_task_status', table_name='task', postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_task_id', table_name='task', postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_task_id',
+            'task',
+            ['id'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_task_status',
+            'task',
+            ['status'],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_task_status_created_at_id',
+            table_name='task',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,56 @@
+"""task status enum
+
+Revision ID: 0004_task_status_enum
+Revises: 0003_task_index_audit
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0004_task_status_enum'
+down_revision = '0003_task_index_audit'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('Создано', 'В работе', 'Завершено')
+task_status = postgresql.ENUM(*STATUSES, name='task_status')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        #  На sqlite статус и так хранится строкой с CHECK-ограничением.
+        return
+
+    task_status.create(op.get_bind())
+    op.drop_constraint('check_status', 'task', type_='check')
+    op.alter_column('task', 'status', server_default=None)
+    #  Значения уже совпадают с метками ENUM, индексы по status
+    #  перестраиваются postgres при смене типа.
+    op.alter_column(
+        'task',
+        'status',
+        type_=task_status,
+        postgresql_using='status::task_status',
+    )
+    op.alter_column('task', 'status', server_default=STATUSES[0])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+
+    op.alter_column('task', 'status', server_default=None)
+    op.alter_column(
+        'task',
+        'status',
+        type_=sa.String(length=20),
+        postgresql_using='status::text',
+    )
+    op.alter_column('task', 'status', server_default=STATUSES[0])
+    op.create_check_constraint(
+        'check_status', 'task', sa.column('status').in_(STATUSES)
+    )
+    task_status.drop(op.get_bind())
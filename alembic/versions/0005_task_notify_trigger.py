@@ -0,0 +1,74 @@
+"""task notify trigger
+
+Revision ID: 0005_task_notify_trigger
+Revises: 0004_task_status_enum
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0005_task_notify_trigger'
+down_revision = '0004_task_status_enum'
+branch_labels = None
+depends_on = None
+
+#  Канал и application_name совпадают с EVENT_BUS_CHANNEL и
+#  DB_APPLICATION_NAME из app/core/constants.py. Изменения, сделанные
+#  самим приложением, уже отправлены в канал из TaskCRUD. Описание в
+#  payload не передается: предел NOTIFY 8000 байт, клиент перечитывает
+#  задачу через API.
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_task_change() RETURNS trigger AS $$
+DECLARE
+    task record;
+BEGIN
+    IF current_setting('application_name', true) = 'task_manager' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        task := OLD;
+    ELSE
+        task := NEW;
+    END IF;
+    PERFORM pg_notify(
+        'task_events',
+        json_build_object(
+            'event', CASE TG_OP
+                WHEN 'INSERT' THEN 'task_created'
+                WHEN 'UPDATE' THEN 'task_updated'
+                ELSE 'task_deleted'
+            END,
+            'data', json_build_object(
+                'id', task.id,
+                'name', task.name,
+                'status', task.status,
+                'updated_at', task.updated_at,
+                'truncated', true
+            )
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        #  LISTEN/NOTIFY есть только в postgres.
+        return
+
+    op.execute(NOTIFY_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER task_notify AFTER INSERT OR UPDATE OR DELETE '
+        'ON task FOR EACH ROW EXECUTE FUNCTION notify_task_change()'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+
+    op.execute('DROP TRIGGER IF EXISTS task_notify ON task')
+    op.execute('DROP FUNCTION IF EXISTS notify_task_change()')
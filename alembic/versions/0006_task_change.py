@@ -0,0 +1,49 @@
+"""task change log
+
+Revision ID: 0006_task_change
+Revises: 0005_task_notify_trigger
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_task_change'
+down_revision = '0005_task_notify_trigger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'task_change',
+        sa.Column(
+            'id',
+            sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+            autoincrement=True,
+            nullable=False,
+            comment='Номер изменения',
+        ),
+        sa.Column(
+            'event',
+            sa.String(length=32),
+            nullable=False,
+            comment='Тип события',
+        ),
+        sa.Column(
+            'data', sa.JSON(), nullable=False, comment='Данные события'
+        ),
+        sa.Column(
+            'created_at',
+            sa.DateTime(),
+            server_default=sa.text('CURRENT_TIMESTAMP'),
+            nullable=True,
+            comment='Дата создания',
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('task_change')
@@ -0,0 +1,42 @@
+"""task change outbox
+
+Revision ID: 0007_task_change_outbox
+Revises: 0006_task_change
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_task_change_outbox'
+down_revision = '0006_task_change'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'task_change',
+        sa.Column(
+            'dispatched_at',
+            sa.DateTime(),
+            nullable=True,
+            comment='Дата рассылки события',
+        ),
+    )
+    #  Изменения до outbox уже разосланы в запросах.
+    op.execute('UPDATE task_change SET dispatched_at = created_at')
+    op.create_index(
+        'ix_task_change_undispatched',
+        'task_change',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('dispatched_at IS NULL'),
+        sqlite_where=sa.text('dispatched_at IS NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_task_change_undispatched', table_name='task_change')
+    op.drop_column('task_change', 'dispatched_at')
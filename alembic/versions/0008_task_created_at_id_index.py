@@ -0,0 +1,35 @@
+"""task created_at id index
+
+Revision ID: 0008_task_created_at_id_index
+Revises: 0007_task_change_outbox
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0008_task_created_at_id_index'
+down_revision = '0007_task_change_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #  Индекс keyset-пагинации по (created_at, id). Таблица уже может быть
+    #  большой, поэтому индекс строится CONCURRENTLY, вне транзакции.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_task_created_at_id',
+            'task',
+            ['created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_task_created_at_id',
+            table_name='task',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,143 @@
+import logging
+from typing import AsyncIterator, Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.websocket import (
+    BATCH_EVENT,
+    PING_EVENT,
+    ClientConnection,
+    ConnectionManager,
+    get_connection_manager,
+)
+from app.core.db import get_async_session
+from app.crud.task_changes import TaskChangeCRUD, get_task_changes
+
+router = APIRouter(prefix='/tasks')
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    #  nginx не буферизует поток событий.
+    'X-Accel-Buffering': 'no',
+}
+#  Комментарий SSE: браузер его не показывает, прокси не рвут соединение.
+PING_COMMENT = ': ping\n\n'
+
+
+def event_seq(message: dict) -> Optional[int]:
+    """Номер последнего изменения в сообщении, None - номера нет"""
+
+    if message.get('event') == BATCH_EVENT:
+        seqs = [
+            item['seq'] for item in message['data'] if item.get('seq')
+        ]
+        return max(seqs, default=None)
+    return message.get('seq')
+
+
+class EventStreamConnection(ClientConnection):
+    """Подписчик потока Server-Sent Events.
+
+    Своей задачи отправки нет: очередь читает генератор тела ответа,
+    поэтому простаивающий подписчик - это только очередь и индекс тем.
+    Кадр строится один раз на всех подписчиков SSE.
+    """
+
+    needs_ping = True
+
+    def format_frame(self, message: dict, text: str) -> str:
+        if message.get('event') == PING_EVENT:
+            return PING_COMMENT
+        seq = event_seq(message)
+        event_id = f'id: {seq}\n' if seq is not None else ''
+        return f'{event_id}data: {text}\n\n'
+
+    def close(self, code: Optional[int] = None) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def _start_writer(self) -> None:
+        return None
+
+    async def frames(self) -> AsyncIterator[str]:
+        """Кадры из очереди до закрытия соединения"""
+
+        while True:
+            frame = await self.queue.get()
+            if frame is None:
+                return
+            yield frame
+            if frame is self._lagging_frame:
+                self.lagging = False
+
+
+@router.get(
+    '/events',
+    response_class=StreamingResponse,
+    summary='Поток событий задач',
+    description=(
+        'Server-Sent Events с теми же событиями, что и websocket. id события '
+        '- номер изменения: после переподключения сервер повторяет '
+        'изменения после Last-Event-ID или since'
+    ),
+)
+async def stream_events(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    connection_manager: ConnectionManager = Depends(get_connection_manager),
+    task_changes: TaskChangeCRUD = Depends(get_task_changes),
+    session: AsyncSession = Depends(get_async_session),
+) -> StreamingResponse:
+    host = request.client.host if request.client else None
+    reason = connection_manager.admit(host)
+    if reason is not None:
+        logger.warning(f'Поток событий для {host} отклонен: {reason}')
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=reason
+        )
+
+    connection = connection_manager.add_connection(
+        request, host, connection_class=EventStreamConnection
+    )
+    logger.info(f'Подписчик событий {host} добавлен в менеджер.')
+    #  Браузер сам передает Last-Event-ID при переподключении.
+    if last_event_id is not None:
+        since = last_event_id
+    try:
+        if since is not None:
+            logger.info(f'Повтор изменений после {since} для {host}.')
+            await connection_manager.resume(
+                request, since, session, task_changes
+            )
+        #  Соединение с БД не держится, пока открыт поток.
+        await session.close()
+    except BaseException:
+        connection_manager.close_connection(request)
+        raise
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            async for frame in connection.frames():
+                yield frame
+        finally:
+            connection_manager.close_connection(request)
+            logger.info(f'Поток событий для {host} закрыт.')
+
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers=EVENT_STREAM_HEADERS,
+    )
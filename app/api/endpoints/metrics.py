@@ -0,0 +1,62 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.websocket import (
+    ConnectionManager,
+    get_connection_manager,
+)
+from app.core.cache import LRUTTLCache, get_task_cache
+from app.core.db import get_async_session
+from app.core.outbox import OutboxDispatcher, get_task_outbox
+from app.core.replica import TaskReplica, get_task_replica
+from app.core.singleflight import SingleFlight, get_task_flights
+
+router = APIRouter(prefix='/metrics')
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    '/',
+    summary='Метрики приложения',
+    description=(
+        'Возвращает счетчики кэша задач, объединенных запросов чтения, '
+        'очередей websocket, рассылки из журнала и размер реплики задач '
+        'текущего процесса'
+    ),
+)
+async def get_metrics(
+    task_cache: LRUTTLCache = Depends(get_task_cache),
+    task_replica: Optional[TaskReplica] = Depends(get_task_replica),
+    task_flights: Optional[SingleFlight] = Depends(get_task_flights),
+    connection_manager: ConnectionManager = Depends(get_connection_manager),
+    task_outbox: Optional[OutboxDispatcher] = Depends(get_task_outbox),
+) -> dict:
+    return {
+        'task_cache': task_cache.stats(),
+        'task_replica': task_replica.stats() if task_replica else None,
+        'task_flights': task_flights.stats() if task_flights else None,
+        'websocket': connection_manager.stats(),
+        'task_outbox': task_outbox.stats() if task_outbox else None,
+    }
+
+
+@router.get(
+    '/replica',
+    summary='Сверка реплики задач',
+    description='Сверяет реплику задач текущего процесса с БД',
+)
+async def verify_replica(
+    task_replica: Optional[TaskReplica] = Depends(get_task_replica),
+    session: AsyncSession = Depends(get_async_session),
+) -> dict:
+    if task_replica is None or not task_replica.loaded:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Реплика задач отключена.',
+        )
+
+    logger.info('Сверка реплики задач с БД.')
+    return await task_replica.verify(session)
@@ -1,54 +1,263 @@
 import logging
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import MAX_CHANGES_PAGE
 from app.core.db import get_async_session
+from app.crud.task_changes import TaskChangeCRUD, get_task_changes
 from app.crud.task_manager import TaskCRUD, get_task_crud
 from app.models.task_manager import Task
-from app.schemas.filters import TaskFilter, validate_filters
+from app.schemas.fields import get_fields, partial_task_schema, select_fields
+from app.schemas.filters import (
+    TaskFilter,
+    validate_bulk_filters,
+    validate_export_filters,
+    validate_filters,
+)
+from app.schemas.pagination import (
+    NEXT_CURSOR_HEADER,
+    Pagination,
+    get_pagination,
+)
 from app.schemas.task_manager import (
+    BulkCreateTaskResultSchema,
+    BulkCreateTaskSchema,
+    BulkDeleteTaskSchema,
+    BulkStatusTaskSchema,
+    BulkTaskIdsSchema,
     CreateTaskSchema,
     GetTaskSchema,
+    ImportTasksResultSchema,
+    TaskChangesSchema,
     UpdateTaskSchema,
 )
+from app.utils.etag import ETAG_HEADER, etag_matches, make_etag, not_modified
+from app.utils.export import (
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    encode_rows,
+    gzip_chunks,
+)
+from app.utils.serialization import RawJSONResponse, dump_rows
+from app.utils.task_import import iter_import_records
 
 router = APIRouter(prefix='/tasks')
 logger = logging.getLogger(__name__)
 
 
+def check_bulk_target(filters: TaskFilter, ids: Optional[list]) -> None:
+    """Запрещает массовые операции без фильтра и списка id"""
+
+    if ids is None and not filters.model_dump(exclude_none=True):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Укажите ids или хотя бы один фильтр.',
+        )
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    summary='Выгрузка задач',
+    description=(
+        'Потоково выгружает задачи по фильтру в формате NDJSON или CSV, '
+        'опционально со сжатием gzip'
+    ),
+)
+async def export_tasks(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+    compress: bool = Query(False, alias='gzip'),
+    filters: TaskFilter = Depends(validate_export_filters),
+    task_crud: TaskCRUD = Depends(get_task_crud),
+    session: AsyncSession = Depends(get_async_session),
+) -> StreamingResponse:
+
+    async def stream_rows():
+        #  Сессия зависимости закрывается до отправки тела ответа,
+        #  поэтому выгрузка читает БД в собственной сессии.
+        async with AsyncSession(session.bind) as export_session:
+            partitions = task_crud.stream_partitions(
+                session=export_session, filters=filters
+            )
+            async for chunk in encode_rows(partitions, export_format):
+                yield chunk
+
+    logger.info(f'Подготовка к выгрузке задач в {export_format.value}.')
+    body = stream_rows()
+    headers = {
+        'Content-Disposition': (
+            f'attachment; filename="tasks.{export_format.value}"'
+        ),
+    }
+    if compress:
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+
+    return StreamingResponse(
+        body, media_type=EXPORT_MEDIA_TYPES[export_format], headers=headers
+    )
+
+
+@router.get(
+    '/changes',
+    response_model=TaskChangesSchema,
+    summary='Журнал изменений задач',
+    description=(
+        'Возвращает изменения задач с номером больше since по возрастанию '
+        'номера, не больше limit. 410 - изменения после since уже удалены '
+        'из журнала, список задач нужно перечитать целиком'
+    ),
+)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(MAX_CHANGES_PAGE, ge=1, le=MAX_CHANGES_PAGE),
+    task_changes: TaskChangeCRUD = Depends(get_task_changes),
+    session: AsyncSession = Depends(get_async_session),
+) -> dict:
+
+    logger.info(f'Получение изменений задач после {since}.')
+    changes = await task_changes.get_since(session, since, limit)
+    if changes is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f'Изменения после {since} удалены из журнала, '
+            'перечитайте список задач.',
+        )
+
+    return {
+        'changes': changes,
+        'last_seq': changes[-1]['seq'] if changes else since,
+    }
+
+
+def task_etag(task_id, updated_at, fields=None) -> str:
+    return make_etag('task', str(task_id), updated_at.isoformat(), fields)
+
+
+def tasks_list_etag(
+    task_crud: TaskCRUD,
+    filters: TaskFilter,
+    pagination: Pagination,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Optional[str]:
+    """ETag страницы списка по счетчику изменений таблицы в процессе"""
+
+    if task_crud.generation is None:
+        return None
+    return make_etag(
+        'tasks',
+        str(task_crud.generation),
+        task_crud.filters_key(filters),
+        pagination.limit,
+        pagination.cursor,
+        fields,
+    )
+
+
 @router.get(
     '/{task_id}',
     response_model=GetTaskSchema,
     summary='Получение задачи',
-    description='Получает задачу по id',
+    description=(
+        'Получает задачу по id. При совпадении If-None-Match с ETag '
+        'задачи возвращает 304 без тела. Параметр fields ограничивает '
+        'поля ответа'
+    ),
 )
 async def get_task(
     task_id: uuid.UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields),
     task_crud: TaskCRUD = Depends(get_task_crud),
     session: AsyncSession = Depends(get_async_session),
 ) -> Task:
 
+    if if_none_match:
+        updated_at = await task_crud.get_version(session=session, pk=task_id)
+        if updated_at:
+            etag = task_etag(task_id, updated_at, fields)
+            if etag_matches(if_none_match, etag):
+                logger.info(f'Объект с id "{task_id}" не изменился.')
+                return not_modified(etag)
+
     logger.info(f'Подготовка к получению объекта с id "{task_id}".')
-    return await task_crud.get_or_404(session=session, pk=task_id)
+    if fields is None:
+        task = await task_crud.get_or_404(session=session, pk=task_id)
+        response.headers[ETAG_HEADER] = task_etag(task.id, task.updated_at)
+        return task
+
+    row = await task_crud.get_row_or_404(
+        session=session, pk=task_id, fields=select_fields(fields)
+    )
+    schema = partial_task_schema(fields)
+    return RawJSONResponse(
+        schema.model_validate(row).model_dump_json(),
+        headers={
+            ETAG_HEADER: task_etag(row['id'], row['updated_at'], fields)
+        },
+    )
 
 
 @router.get(
     '/',
     response_model=List[GetTaskSchema],
+    response_class=RawJSONResponse,
     summary='Получение списка задач',
-    description='Получает список всех задач',
+    description=(
+        'Получает страницу задач, отсортированную по дате создания. '
+        'Курсор следующей страницы передается в заголовке '
+        f'{NEXT_CURSOR_HEADER}. Пока задачи не менялись, на запрос с '
+        'If-None-Match возвращает 304 без тела. Параметр fields '
+        'ограничивает поля ответа и читаемые из БД колонки'
+    ),
 )
 async def get_tasks_list(
+    if_none_match: Optional[str] = Header(None),
     filters: TaskFilter = Depends(validate_filters),
+    pagination: Pagination = Depends(get_pagination),
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields),
     task_crud: TaskCRUD = Depends(get_task_crud),
     session: AsyncSession = Depends(get_async_session),
-) -> Optional[List[Task]]:
+) -> RawJSONResponse:
+
+    #  ETag считается до чтения: изменение во время чтения даст новый
+    #  ETag следующему запросу.
+    etag = tasks_list_etag(task_crud, filters, pagination, fields)
+    if etag and etag_matches(if_none_match, etag):
+        logger.info('Список задач не изменился.')
+        return not_modified(etag)
 
     logger.info('Подготовка к получению списка объектов из БД.')
-    return await task_crud.get_list(session=session, filters=filters)
+    rows, next_cursor = await task_crud.get_page_rows(
+        session=session,
+        filters=filters,
+        pagination=pagination,
+        fields=select_fields(fields) if fields else None,
+    )
+    if fields:
+        rows = [{field: row[field] for field in fields} for row in rows]
+
+    #  Строки сериализуются напрямую, минуя ORM и response_model.
+    response = RawJSONResponse(dump_rows(rows))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if etag:
+        response.headers[ETAG_HEADER] = etag
+    return response
 
 
 @router.post(
@@ -66,6 +275,110 @@ async def create_task(
     return await task_crud.create(session=session, data=task_data.model_dump())
 
 
+@router.post(
+    '/bulk',
+    response_model=BulkCreateTaskResultSchema,
+    summary='Пакетное создание задач',
+    description=(
+        'Создает пакет задач одним запросом к БД. Задачи с занятыми '
+        'именами пропускаются и возвращаются в списке ошибок'
+    ),
+)
+async def bulk_create_tasks(
+    tasks_data: BulkCreateTaskSchema,
+    task_crud: TaskCRUD = Depends(get_task_crud),
+    session: AsyncSession = Depends(get_async_session),
+) -> BulkCreateTaskResultSchema:
+
+    logger.info(f'Подготовка к пакетному созданию {len(tasks_data)} задач.')
+    created, errors = await task_crud.bulk_create(
+        session=session,
+        data=[task_data.model_dump() for task_data in tasks_data],
+    )
+    return BulkCreateTaskResultSchema(created=created, errors=errors)
+
+
+@router.patch(
+    '/bulk/status',
+    response_model=BulkTaskIdsSchema,
+    summary='Массовая смена статуса',
+    description=(
+        'Меняет статус всех задач по фильтру и/или списку id одним '
+        'запросом. Задачи, для которых переход статуса недопустим, '
+        'пропускаются'
+    ),
+)
+async def bulk_update_status(
+    bulk_data: BulkStatusTaskSchema,
+    filters: TaskFilter = Depends(validate_bulk_filters),
+    task_crud: TaskCRUD = Depends(get_task_crud),
+    session: AsyncSession = Depends(get_async_session),
+) -> BulkTaskIdsSchema:
+
+    check_bulk_target(filters, bulk_data.ids)
+    logger.info(f'Массовая смена статуса на {bulk_data.status.value}.')
+    ids = await task_crud.bulk_update_status(
+        session=session,
+        new_status=bulk_data.status.value,
+        filters=filters,
+        ids=bulk_data.ids,
+    )
+    return BulkTaskIdsSchema(ids=ids, count=len(ids))
+
+
+@router.post(
+    '/bulk/delete',
+    response_model=BulkTaskIdsSchema,
+    summary='Массовое удаление задач',
+    description='Удаляет все задачи по фильтру и/или списку id одним запросом',
+)
+async def bulk_delete_tasks(
+    bulk_data: BulkDeleteTaskSchema,
+    filters: TaskFilter = Depends(validate_bulk_filters),
+    task_crud: TaskCRUD = Depends(get_task_crud),
+    session: AsyncSession = Depends(get_async_session),
+) -> BulkTaskIdsSchema:
+
+    check_bulk_target(filters, bulk_data.ids)
+    logger.info('Подготовка к массовому удалению задач.')
+    ids = await task_crud.bulk_delete(
+        session=session, filters=filters, ids=bulk_data.ids
+    )
+    return BulkTaskIdsSchema(ids=ids, count=len(ids))
+
+
+@router.post(
+    '/import',
+    response_model=ImportTasksResultSchema,
+    summary='Импорт задач из файла',
+    description=(
+        'Потоково импортирует задачи из тела запроса в формате NDJSON или '
+        'CSV. Задачи с занятыми именами отклоняются'
+    ),
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                media_type: {'schema': {'type': 'string'}}
+                for media_type in EXPORT_MEDIA_TYPES.values()
+            },
+        },
+    },
+)
+async def import_tasks(
+    request: Request,
+    import_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+    task_crud: TaskCRUD = Depends(get_task_crud),
+    session: AsyncSession = Depends(get_async_session),
+) -> dict:
+
+    logger.info(f'Подготовка к импорту задач из {import_format.value}.')
+    return await task_crud.bulk_import(
+        session=session,
+        records=iter_import_records(request.stream(), import_format),
+    )
+
+
 @router.patch(
     '/{task_id}',
     response_model=GetTaskSchema,
@@ -79,10 +392,9 @@ async def update_task(
     session: AsyncSession = Depends(get_async_session),
 ) -> Task:
 
-    instance = await task_crud.get_or_404(session=session, pk=task_id)
     return await task_crud.update(
         session=session,
-        instance=instance,
+        pk=task_id,
         new_data=new_task_data.model_dump(
             exclude_unset=True, exclude_none=True
         ),
@@ -101,5 +413,4 @@ async def delete_task(
     task_crud: TaskCRUD = Depends(get_task_crud),
     session: AsyncSession = Depends(get_async_session),
 ):
-    instance = await task_crud.get_or_404(session=session, pk=task_id)
-    await task_crud.delete(session=session, instance=instance)
+    await task_crud.delete(session=session, pk=task_id)
@@ -1,32 +1,518 @@
+import asyncio
 import logging
+from collections import Counter, OrderedDict, defaultdict
+from typing import Callable, Iterable, List, Optional, Set, Type
 
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import (
+    APIRouter,
+    Depends,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.constants import MAX_WS_TOPICS, TASK_EVENTS
+from app.core.db import get_async_session
+from app.core.event_bus import (
+    RESYNC_EVENT,
+    EventBus,
+    InProcessEventBus,
+    create_event_bus,
+)
+from app.crud.task_changes import TaskChangeCRUD, get_task_changes
+from app.schemas.websocket import ClientMessageSchema, Topic
+from app.utils.serialization import dump_json
 
 router = APIRouter(prefix='/tasks/ws')
 logger = logging.getLogger(__name__)
 
+#  Событие, заменяющее сообщения, которые клиент не успел прочитать.
+LAGGING_EVENT = 'lagging'
+#  Ответ на сообщение клиента о подписке.
+SUBSCRIPTIONS_EVENT = 'subscriptions'
+ERROR_EVENT = 'error'
+#  Проверка соединения, клиент отвечает {"action": "pong"}.
+PING_EVENT = 'ping'
+#  Пакет событий, собранных за окно WS_BATCH_WINDOW.
+BATCH_EVENT = 'batch'
+SINGLE_TASK_EVENTS = ('task_created', 'task_updated', 'task_deleted')
+#  Тема клиентов без подписок: они получают все события.
+ALL_TOPIC: Topic = ('all', '')
 
-class ConnectionManager:
 
-    def __init__(self):
-        self.active_connections: set[WebSocket] = set()
+def encode_message(message: dict) -> str:
+    """Кодирует сообщение в текстовый кадр websocket."""
 
-    def add_connection(self, client: WebSocket) -> None:
-        self.active_connections.add(client)
+    return dump_json(message).decode()
 
-    def close_connection(self, client):
-        self.active_connections.discard(client)
 
-    async def broadcast(self, data):
-        for client in self.active_connections.copy():
+PING_MESSAGE = {'event': PING_EVENT, 'data': {}}
+PING_FRAME = encode_message(PING_MESSAGE)
+
+
+def event_topics(message: dict) -> Optional[Set[Topic]]:
+    """Темы события, None - событие получают все клиенты.
+
+    Всем уходят события без id задач (tasks_imported, resync). Статус
+    задачи в событии - новый.
+    """
+
+    event, data = message['event'], message['data']
+    if event == BATCH_EVENT:
+        topics = set()
+        for item in data:
+            item_topics = event_topics(item)
+            if item_topics is None:
+                return None
+            topics |= item_topics
+        return topics
+    if event not in TASK_EVENTS or event == 'tasks_imported':
+        return None
+
+    topics = {ALL_TOPIC, ('event', event)}
+    tasks = data if isinstance(data, list) else [data]
+    for task in tasks:
+        if 'id' in task:
+            topics.add(('id', task['id']))
+        if 'status' in task:
+            #  Локально статус - TaskStatus, из шины - строка.
+            status_value = getattr(task['status'], 'value', task['status'])
+            topics.add(('status', status_value))
+    for pk in data.get('ids', ()) if isinstance(data, dict) else ():
+        topics.add(('id', pk))
+    return topics
+
+
+class ClientConnection:
+    """Клиент websocket с ограниченной очередью исходящих сообщений.
+
+    Сообщения отправляет отдельная задача-писатель, поэтому рассылка
+    только кладет их в очередь и не ждет медленных клиентов. В очереди
+    лежат уже закодированные кадры, общие для всех клиентов одного вида.
+    """
+
+    #  Websocket проверяет uvicorn ping на уровне протокола, ping в JSON
+    #  нужен только клиентам, отвечающим pong при WS_IDLE_TIMEOUT.
+    needs_ping = False
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        queue_size: int,
+        on_error: Callable[[WebSocket], None],
+        host: Optional[str] = None,
+    ):
+        self.websocket = websocket
+        self.host = host
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.topics: Set[Topic] = set()
+        self._held: Optional[List[str]] = None
+        self.lagging = False
+        self.dropped = 0
+        self._lagging_frame: Optional[str] = None
+        self._on_error = on_error
+        self._writer: Optional[asyncio.Task] = self._start_writer()
+
+    def format_frame(self, message: dict, text: str) -> str:
+        """Кадр клиента из сообщения и его JSON"""
+
+        return text
+
+    def encode(self, message: dict) -> str:
+        return self.format_frame(message, encode_message(message))
+
+    def enqueue(self, frame: str) -> bool:
+        """Кладет сообщение в очередь, False - клиента нужно отключить.
+
+        При первом переполнении очередь очищается и клиент получает
+        событие lagging с числом пропущенных сообщений. Если очередь
+        переполнится раньше, чем клиент его прочитает, клиент отключается.
+        """
+
+        if self._held is not None:
+            self._held.append(frame)
+            return len(self._held) <= self.queue.maxsize
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            if self.lagging:
+                return False
+
+        dropped = self.queue.qsize()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.dropped += dropped
+        self.lagging = True
+
+        self._lagging_frame = self.encode(
+            {'event': LAGGING_EVENT, 'data': {'dropped': dropped}}
+        )
+        self.queue.put_nowait(self._lagging_frame)
+        if not self.queue.full():
+            self.queue.put_nowait(frame)
+        return True
+
+    def hold(self) -> None:
+        """Откладывает новые сообщения до release, пока идет повтор"""
+
+        self._held = []
+
+    def release(self, frames: List[str]) -> bool:
+        """Отправляет frames, затем отложенные сообщения"""
+
+        held, self._held = self._held or [], None
+        return all([self.enqueue(frame) for frame in [*frames, *held]])
+
+    def close(self, code: Optional[int] = None) -> None:
+        self._writer.cancel()
+        if code is not None:
+            _run_in_background(self._close_socket(code))
+
+    def _start_writer(self) -> Optional[asyncio.Task]:
+        return asyncio.create_task(self._write())
+
+    async def _write(self) -> None:
+        while True:
+            frame = await self.queue.get()
             try:
-                await client.send_json(data)
+                await self.websocket.send_text(frame)
             except (WebSocketDisconnect, RuntimeError) as e:
                 logger.warning(f'Не удалось отправить сообщение: {e}')
-                self.close_connection(client)
+                self._on_error(self.websocket)
+                return
+            if frame is self._lagging_frame:
+                self.lagging = False
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+
+class EventCoalescer:
+    """Собирает события за окно и передает их одним пакетом.
+
+    Из событий об одной задаче в пакете остается последнее, обновление
+    только что созданной задачи остается событием task_created. Пакетные
+    события передаются как есть, порядок событий сохраняется.
+    """
+
+    def __init__(self, window: float, flush: Callable[[dict], None]):
+        self.window = window
+        self._on_flush = flush
+        self._events: OrderedDict = OrderedDict()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._sequence = 0
+
+        self.received = 0
+        self.batches = 0
+
+    def add(self, message: dict) -> None:
+        self.received += 1
+        key, message = self._merge(message)
+        #  Событие встает на место последнего изменения задачи.
+        self._events.pop(key, None)
+        self._events[key] = message
+        if self._handle is None:
+            self._handle = asyncio.get_running_loop().call_later(
+                self.window, self.flush
+            )
+
+    def flush(self) -> None:
+        self._handle = None
+        if not self._events:
+            return
+        events = list(self._events.values())
+        self._events.clear()
+        self.batches += 1
+        self._on_flush({'event': BATCH_EVENT, 'data': events})
+
+    def cancel(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._events.clear()
+
+    def _merge(self, message: dict) -> tuple:
+        if message['event'] not in SINGLE_TASK_EVENTS:
+            self._sequence += 1
+            return ('message', self._sequence), message
+
+        key = ('task', message['data']['id'])
+        previous = self._events.get(key)
+        if (
+            previous is not None
+            and previous['event'] == 'task_created'
+            and message['event'] == 'task_updated'
+        ):
+            message = {**message, 'event': 'task_created'}
+        return key, message
+
 
+_background_tasks: set = set()
 
-manager = ConnectionManager()
+
+def _run_in_background(coroutine) -> None:
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+class ConnectionManager:
+
+    def __init__(
+        self,
+        queue_size: int = settings.ws_queue_size,
+        bus: Optional[EventBus] = None,
+        batch_window: float = settings.ws_batch_window,
+        ping_interval: float = settings.ws_ping_interval,
+        idle_timeout: float = settings.ws_idle_timeout,
+        max_connections: int = settings.ws_max_connections,
+        max_connections_per_ip: int = settings.ws_max_connections_per_ip,
+    ):
+        self.queue_size = queue_size
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.coalescer = (
+            EventCoalescer(batch_window, flush=self._send)
+            if batch_window > 0
+            else None
+        )
+        self.bus = bus or InProcessEventBus()
+        self.bus.subscribe(self.deliver)
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self.subscribers: dict[Topic, Set[WebSocket]] = defaultdict(set)
+        self.connections_per_ip: Counter = Counter()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.slow_disconnects = 0
+        self.idle_disconnects = 0
+        self.rejected = 0
+
+    def admit(self, host: Optional[str]) -> Optional[str]:
+        """Причина отказа в новом соединении, None - соединение допустимо"""
+
+        if len(self.active_connections) >= self.max_connections:
+            reason = 'Превышено число соединений.'
+        elif self.connections_per_ip[host] >= self.max_connections_per_ip:
+            reason = 'Превышено число соединений с адреса.'
+        else:
+            return None
+        self.rejected += 1
+        return reason
+
+    def add_connection(
+        self,
+        client: WebSocket,
+        host: Optional[str] = None,
+        connection_class: Type[ClientConnection] = ClientConnection,
+    ) -> ClientConnection:
+        connection = connection_class(
+            client, self.queue_size, on_error=self.close_connection, host=host
+        )
+        self.active_connections[client] = connection
+        self.subscribers[ALL_TOPIC].add(client)
+        self.connections_per_ip[host] += 1
+        if self.ping_interval > 0 and self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._ping())
+        return connection
+
+    def close_connection(self, client, code: Optional[int] = None):
+        connection = self.active_connections.pop(client, None)
+        if connection is None:
+            return
+        self._unindex(client, connection.topics | {ALL_TOPIC})
+        self.connections_per_ip[connection.host] -= 1
+        if not self.connections_per_ip[connection.host]:
+            del self.connections_per_ip[connection.host]
+        connection.close(code)
+
+    def subscribe(self, client: WebSocket, topics: Iterable[Topic]) -> None:
+        connection = self.active_connections[client]
+        topics = set(topics) - connection.topics
+        if len(connection.topics) + len(topics) > MAX_WS_TOPICS:
+            raise ValueError(f'Больше {MAX_WS_TOPICS} подписок.')
+        if not topics:
+            return
+        if not connection.topics:
+            self._unindex(client, {ALL_TOPIC})
+        connection.topics |= topics
+        for topic in topics:
+            self.subscribers[topic].add(client)
+
+    def unsubscribe(
+        self, client: WebSocket, topics: Optional[Iterable[Topic]] = None
+    ) -> None:
+        """Отписывает клиента от тем, от всех - если topics не переданы"""
+
+        connection = self.active_connections[client]
+        topics = connection.topics if topics is None else set(topics)
+        topics = topics & connection.topics
+        connection.topics -= topics
+        self._unindex(client, topics)
+        if not connection.topics:
+            self.subscribers[ALL_TOPIC].add(client)
+
+    def handle_message(self, client: WebSocket, text: str) -> None:
+        """Применяет сообщение клиента о подписке и отвечает ему"""
+
+        connection = self.active_connections[client]
+        try:
+            message = ClientMessageSchema.model_validate_json(text)
+            if message.action == 'pong':
+                return
+            if message.action == 'subscribe':
+                self.subscribe(client, message.topics())
+            else:
+                self.unsubscribe(client, message.topics() or None)
+        except (ValidationError, ValueError) as e:
+            reply = {'event': ERROR_EVENT, 'data': {'detail': str(e)}}
+        else:
+            topics = defaultdict(list)
+            for kind, value in sorted(connection.topics):
+                topics[kind].append(value)
+            reply = {'event': SUBSCRIPTIONS_EVENT, 'data': dict(topics)}
+        connection.enqueue(connection.encode(reply))
+
+    async def resume(
+        self,
+        client: WebSocket,
+        since: int,
+        session: AsyncSession,
+        task_changes: TaskChangeCRUD,
+    ) -> None:
+        """Повторяет клиенту изменения после since из журнала.
+
+        События, разосланные во время чтения журнала, отправляются после
+        повтора, поэтому часть событий может прийти дважды, их отличает
+        seq. Если изменений больше очереди клиента или они уже удалены из
+        журнала, клиент получает resync и перечитывает данные через API.
+        """
+
+        connection = self.active_connections[client]
+        connection.hold()
+        try:
+            changes = await task_changes.get_since(
+                session, since, limit=self.queue_size
+            )
+        except Exception:
+            connection.release([])
+            raise
+
+        if changes is None or len(changes) >= self.queue_size:
+            frames = [connection.encode({'event': RESYNC_EVENT, 'data': {}})]
+        else:
+            frames = [connection.encode(change) for change in changes]
+        if not connection.release(frames):
+            self.close_connection(client, code=status.WS_1013_TRY_AGAIN_LATER)
+
+    def _unindex(self, client: WebSocket, topics: Iterable[Topic]) -> None:
+        for topic in topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(client)
+            if not subscribers:
+                del self.subscribers[topic]
+
+    async def broadcast(self, data):
+        """Рассылает сообщение клиентам всех процессов через шину событий"""
+
+        await self.bus.publish(data)
+
+    def deliver(self, data):
+        """Кладет сообщение в очереди клиентов этого процесса"""
+
+        if self.coalescer is not None:
+            self.coalescer.add(data)
+            return
+        self._send(data)
+
+    def _send(self, data):
+        topics = event_topics(data)
+        if topics is None:
+            clients = list(self.active_connections)
+        else:
+            clients = {
+                client
+                for topic in topics
+                for client in self.subscribers.get(topic, ())
+            }
+        if not clients:
+            return
+
+        #  Сообщение кодируется один раз для всех клиентов.
+        self._enqueue(clients, data, encode_message(data))
+
+    def _enqueue(
+        self, clients: Iterable[WebSocket], message: dict, text: str
+    ) -> None:
+        #  Кадр строится один раз на каждый вид клиентов.
+        frames = {}
+        for client in clients:
+            connection = self.active_connections[client]
+            kind = type(connection)
+            if kind not in frames:
+                frames[kind] = connection.format_frame(message, text)
+            if not connection.enqueue(frames[kind]):
+                logger.warning('Клиент не успевает читать, отключение.')
+                self.slow_disconnects += 1
+                self.close_connection(
+                    client, code=status.WS_1013_TRY_AGAIN_LATER
+                )
+
+    async def _ping(self) -> None:
+        """Периодически отправляет ping клиентам.
+
+        Ответ клиента продлевает его idle_timeout в ws, отправка ping
+        мертвому соединению завершается ошибкой и отключает клиента.
+        Без idle_timeout ping получают только клиенты с needs_ping.
+        """
+
+        while self.active_connections:
+            await asyncio.sleep(self.ping_interval)
+            clients = [
+                client
+                for client, connection in self.active_connections.items()
+                if self.idle_timeout > 0 or connection.needs_ping
+            ]
+            self._enqueue(clients, PING_MESSAGE, PING_FRAME)
+        self._heartbeat = None
+
+    def close_all(self) -> None:
+        if self.coalescer is not None:
+            self.coalescer.cancel()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for client in list(self.active_connections):
+            self.close_connection(client, code=status.WS_1001_GOING_AWAY)
+
+    def stats(self) -> dict:
+        connections = self.active_connections.values()
+        return {
+            'connections': len(self.active_connections),
+            'queued': sum(item.queue.qsize() for item in connections),
+            'lagging': sum(item.lagging for item in connections),
+            'dropped': sum(item.dropped for item in connections),
+            'slow_disconnects': self.slow_disconnects,
+            'idle_disconnects': self.idle_disconnects,
+            'rejected': self.rejected,
+            'ips': len(self.connections_per_ip),
+            'topics': len(self.subscribers),
+            'batched_events': getattr(self.coalescer, 'received', 0),
+            'batches': getattr(self.coalescer, 'batches', 0),
+        }
+
+
+manager = ConnectionManager(bus=create_event_bus())
 
 
 def get_connection_manager() -> ConnectionManager:
@@ -36,21 +522,50 @@ def get_connection_manager() -> ConnectionManager:
 @router.websocket('/')
 async def ws(
     websocket: WebSocket,
+    since: Optional[int] = Query(None, ge=0),
     connection_manager: ConnectionManager = Depends(get_connection_manager),
+    task_changes: TaskChangeCRUD = Depends(get_task_changes),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    await websocket.accept()
+    host = websocket.client.host
+    client_addr = f'{host}:{websocket.client.port}'
 
-    client_addr = f'{websocket.client.host}:{websocket.client.port}'
+    reason = connection_manager.admit(host)
+    if reason is not None:
+        #  Отказ до accept: клиент получает 403 без открытия соединения.
+        logger.warning(f'Соединение {client_addr} отклонено: {reason}')
+        await websocket.close(
+            code=status.WS_1013_TRY_AGAIN_LATER, reason=reason
+        )
+        return
+
+    await websocket.accept()
     logger.info(f'Соединение установлено: {client_addr}')
 
-    connection_manager.add_connection(websocket)
+    connection_manager.add_connection(websocket, host)
     logger.info(f'Клиент {client_addr} добавлен в менеджер.')
-
+    idle_timeout = connection_manager.idle_timeout or None
     try:
+        if since is not None:
+            logger.info(f'Повтор изменений после {since} для {client_addr}.')
+            await connection_manager.resume(
+                websocket, since, session, task_changes
+            )
+        #  Соединение с БД не держится, пока открыт websocket.
+        await session.close()
         while True:
-            await websocket.receive_json()
+            text = await asyncio.wait_for(
+                websocket.receive_text(), timeout=idle_timeout
+            )
+            connection_manager.handle_message(websocket, text)
     except WebSocketDisconnect:
         logger.info(f'Клиент отключился: {client_addr}')
+    except asyncio.TimeoutError:
+        logger.info(f'Клиент {client_addr} не отвечает, отключение.')
+        connection_manager.idle_disconnects += 1
+        connection_manager.close_connection(
+            websocket, code=status.WS_1001_GOING_AWAY
+        )
     finally:
         connection_manager.close_connection(websocket)
         logger.info(
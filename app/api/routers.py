@@ -1,8 +1,13 @@
 from fastapi import APIRouter
 
+from app.api.endpoints.events import router as events_router
+from app.api.endpoints.metrics import router as metrics_router
 from app.api.endpoints.task_manager import router as task_manager_router
 from app.api.endpoints.websocket import router as websocket_router
 
 main_router = APIRouter(prefix='/api')
+#  /tasks/events объявлен раньше /tasks/{task_id}.
+main_router.include_router(events_router)
 main_router.include_router(task_manager_router)
 main_router.include_router(websocket_router)
+main_router.include_router(metrics_router)
@@ -1,2 +1,3 @@
 from app.core.db import Base  # noqa
 from app.models.task_manager import Task  # noqa
+from app.models.task_change import TaskChange  # noqa
@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.config import settings
+
+#  Результат get, если ключа нет в кэше.
+NOT_CACHED = object()
+#  Значение отрицательной записи: объекта нет в БД.
+MISSING = object()
+
+
+class LRUTTLCache:
+    """Ограниченный по размеру LRU-кэш с временем жизни записей.
+
+    Хранит также отрицательные записи (объекта нет в БД) с отдельным,
+    более коротким временем жизни. version растет при каждом сбросе:
+    чтение, начатое до сброса, не должно класть в кэш свой результат.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Any:
+        """Возвращает значение, MISSING либо NOT_CACHED."""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return NOT_CACHED
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return NOT_CACHED
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.enabled:
+            self._put(key, value, self.ttl)
+
+    def set_missing(self, key: Hashable) -> None:
+        if self.enabled and self.negative_ttl > 0:
+            self._put(key, MISSING, self.negative_ttl)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.version += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.version += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def _put(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class Generation:
+    """Счетчик изменений таблицы в текущем процессе.
+
+    Токен отличает запуски процесса, чтобы после перезапуска счетчик не
+    совпал с выданным ранее.
+    """
+
+    def __init__(self):
+        self.token = time.time_ns()
+        self.value = 0
+
+    def bump(self) -> None:
+        self.value += 1
+
+    def __str__(self) -> str:
+        return f'{self.token}-{self.value}'
+
+
+task_cache = LRUTTLCache(
+    maxsize=settings.task_cache_size,
+    ttl=settings.task_cache_ttl,
+    negative_ttl=settings.task_cache_negative_ttl,
+)
+
+
+task_generation = Generation()
+
+
+def get_task_cache() -> LRUTTLCache:
+    return task_cache
+
+
+def get_task_generation() -> Optional[Generation]:
+    """Счетчик изменений для ETag списков, None - ETag списков отключены.
+
+    Обо всех изменениях счетчик узнает только из шины postgres: в нее
+    пишут все воркеры и триггер таблицы, в том числе при записи в обход
+    API (скрипты, psql, COPY). С шиной memory такая запись счетчик не
+    увеличит, и клиент получал бы 304 на устаревший список.
+    """
+
+    if settings.event_bus != 'postgres':
+        return None
+    return task_generation
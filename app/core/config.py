@@ -3,7 +3,7 @@ import logging
 import sys
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Optional, Union
+from typing import Literal, Optional, Union
 
 # Thirdparty imports
 from dotenv import load_dotenv
@@ -21,9 +21,80 @@ class Settings(BaseSettings):
     debug_mode: Union[bool, str] = Field(
         default=True, description='Режим отладки'
     )
+    web_concurrency: int = Field(
+        default=1, description='Число воркеров uvicorn (--workers)'
+    )
     secret_key: Optional[str] = Field(
         default=None, description='Секретный ключ приложения'
     )
+    id_generator: Literal['uuid4', 'uuid7'] = Field(
+        default='uuid4', description='Генератор первичных ключей'
+    )
+
+    # cache
+    task_cache_size: int = Field(
+        default=10000, description='Размер кэша задач, 0 - без кэша'
+    )
+    task_cache_ttl: float = Field(
+        default=5.0, description='Время жизни записи кэша задач, сек'
+    )
+    task_cache_negative_ttl: float = Field(
+        default=1.0, description='Время жизни записи об отсутствии задачи'
+    )
+    task_single_flight: bool = Field(
+        default=True,
+        description='Объединять одинаковые одновременные чтения задач',
+    )
+
+    # replica
+    task_replica: bool = Field(
+        default=False,
+        description='Держать копию задач в памяти процесса для чтения',
+    )
+
+    # events
+    task_changes_retention: int = Field(
+        default=86400,
+        description='Сколько секунд хранить журнал изменений задач',
+    )
+    task_outbox: bool = Field(
+        default=True,
+        description='Рассылать события фоновой задачей из журнала изменений',
+    )
+    outbox_batch_size: int = Field(
+        default=500, description='Число событий за один проход рассылки'
+    )
+    outbox_poll_interval: float = Field(
+        default=1.0,
+        description='Интервал проверки журнала на неразосланные события',
+    )
+    event_bus: Literal['memory', 'postgres'] = Field(
+        default='memory',
+        description='Шина событий: в процессе либо LISTEN/NOTIFY postgres',
+    )
+
+    # websocket
+    ws_queue_size: int = Field(
+        default=100,
+        description='Размер очереди исходящих сообщений клиента websocket',
+    )
+    ws_batch_window: float = Field(
+        default=0,
+        description='Окно объединения событий websocket в секундах, 0 - нет',
+    )
+    ws_ping_interval: float = Field(
+        default=20, description='Интервал ping клиентам websocket, 0 - нет'
+    )
+    ws_idle_timeout: float = Field(
+        default=0,
+        description='Отключать клиента websocket без сообщений, 0 - нет',
+    )
+    ws_max_connections: int = Field(
+        default=10000, description='Предел соединений websocket процесса'
+    )
+    ws_max_connections_per_ip: int = Field(
+        default=100, description='Предел соединений websocket с одного IP'
+    )
 
     # postgres
     pg_db: Optional[str] = Field(default='test_db', description='Название БД')
@@ -1,6 +1,56 @@
+from enum import Enum
+
 # Task
 MAX_TASK_NAME_LENGTH = 256
 MIN_TASK_NAME_LENGTH = 1
 MAX_TASK_DESCR_LENGTH = 2000
 MIN_TASK_DESCR_LENGTH = 1
-MAX_TASK_STATUS_LENGTH = 20
+
+
+class TaskStatus(str, Enum):
+
+    CREATED = 'Создано'
+    IN_PROGRESS = 'В работе'
+    COMPLETED = 'Завершено'
+
+
+# Pagination
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Export
+EXPORT_CHUNK_SIZE = 1000
+
+# Bulk
+MAX_BULK_TASKS = 1000
+
+# Import
+IMPORT_CHUNK_SIZE = 5000
+MAX_IMPORT_RECORD_LENGTH = 64 * 1024
+MAX_IMPORT_REJECTED_REPORT = 1000
+
+# Event bus
+#  Канал и application_name зашиты в триггер task (миграция 0005), поэтому
+#  это константы, а не настройки.
+EVENT_BUS_CHANNEL = 'task_events'
+DB_APPLICATION_NAME = 'task_manager'
+
+# Websocket
+TASK_EVENTS = (
+    'task_created',
+    'task_updated',
+    'task_deleted',
+    'tasks_created',
+    'tasks_updated',
+    'tasks_deleted',
+    'tasks_imported',
+)
+MAX_WS_TOPICS = 1000
+
+# Changes
+MAX_CHANGES_PAGE = 1000
+#  Старые изменения удаляются при записи каждого N-го изменения.
+CHANGES_PRUNE_EVERY = 1000
+#  Пропуск в номерах моложе этого числа секунд может быть транзакцией,
+#  которая еще не зафиксирована, более старый - откатом.
+CHANGES_GAP_GRACE = 5
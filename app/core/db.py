@@ -1,4 +1,4 @@
-from uuid import uuid4
+from datetime import datetime
 
 from sqlalchemy import Column, DateTime, String, func
 from sqlalchemy.dialects.postgresql import UUID
@@ -6,16 +6,22 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
 
 from app.core.config import settings
+from app.core.constants import DB_APPLICATION_NAME
+from app.core.ids import generate_id
 
 
-class PreBase:
-    """Базовая модель для классов SQLAlchemy."""
+class NamedBase:
+    """Имя таблицы из имени класса."""
 
     @declared_attr
     def __tablename__(cls):
         """Генерирует имя таблицы в lowercase."""
         return cls.__name__.lower()
 
+
+class PreBase(NamedBase):
+    """Базовая модель для классов SQLAlchemy."""
+
     @declared_attr
     def id(cls):
         if settings.debug_mode == 'local':
@@ -23,33 +29,44 @@ class PreBase:
             return Column(
                 String(36),
                 primary_key=True,
-                default=lambda: str(uuid4()),
-                index=True,
-                unique=True,
+                default=lambda: str(generate_id()),
                 nullable=False,
             )
         #  Для postgres.
         return Column(
             UUID(as_uuid=True),
             primary_key=True,
-            default=uuid4,
-            index=True,
-            unique=True,
+            default=generate_id,
             nullable=False,
         )
 
     created_at = Column(
-        DateTime, server_default=func.now(), comment='Дата создания'
+        DateTime,
+        default=datetime.now,
+        server_default=func.now(),
+        comment='Дата создания',
     )
     updated_at = Column(
         DateTime,
+        default=datetime.now,
         server_default=func.now(),
         comment='Дата обновления',
     )
 
 
 Base = declarative_base(cls=PreBase)
-engine = create_async_engine(settings.database_url)
+#  Для журналов, в которые только добавляются строки: свой первичный ключ
+#  и без даты обновления. Таблицы в тех же метаданных, что и у Base.
+AppendOnlyBase = declarative_base(cls=NamedBase, metadata=Base.metadata)
+engine = create_async_engine(
+    settings.database_url,
+    #  По application_name триггер task отличает записи самого приложения.
+    connect_args=(
+        {}
+        if settings.debug_mode == 'local'
+        else {'server_settings': {'application_name': DB_APPLICATION_NAME}}
+    ),
+)
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
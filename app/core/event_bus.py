@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.constants import DB_APPLICATION_NAME, EVENT_BUS_CHANNEL
+from app.utils.serialization import dump_json
+
+logger = logging.getLogger(__name__)
+
+#  Предел размера payload у NOTIFY в postgres - 8000 байт.
+MAX_NOTIFY_PAYLOAD = 7900
+RECONNECT_DELAY = 1.0
+#  Событие после восстановления шины: часть событий могла быть потеряна.
+RESYNC_EVENT = 'resync'
+
+EventHandler = Callable[[dict], None]
+
+
+class EventBus(ABC):
+    """Шина событий об изменении задач между процессами приложения.
+
+    publish отправляет событие всем процессам, подписанным на шину,
+    включая текущий. Обработчики вызываются синхронно и в порядке
+    получения событий.
+    """
+
+    def __init__(self):
+        self._handlers: List[EventHandler] = []
+
+    def subscribe(self, handler: EventHandler) -> None:
+        self._handlers.append(handler)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, message: dict) -> None:
+        pass
+
+    def _dispatch(self, message: dict) -> None:
+        for handler in self._handlers:
+            try:
+                handler(message)
+            except Exception:
+                logger.exception('Ошибка обработчика события.')
+
+
+class InProcessEventBus(EventBus):
+    """Шина в пределах одного процесса."""
+
+    async def publish(self, message: dict) -> None:
+        self._dispatch(message)
+
+
+class PostgresEventBus(EventBus):
+    """Шина через LISTEN/NOTIFY postgres на выделенном соединении asyncpg.
+
+    На канал также пишет триггер таблицы task, поэтому подписчики получают
+    и изменения, сделанные в обход API.
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._connection = await asyncpg.connect(
+            self.dsn,
+            server_settings={'application_name': DB_APPLICATION_NAME},
+        )
+        self._connection.add_termination_listener(self._on_terminate)
+        await self._connection.add_listener(self.channel, self._on_notify)
+        logger.info(f'Подписка на канал postgres "{self.channel}".')
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        connection.remove_termination_listener(self._on_terminate)
+        await connection.close()
+
+    def _on_terminate(self, connection) -> None:
+        logger.error('Соединение шины событий потеряно, переподключение.')
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while True:
+            try:
+                await self.start()
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(f'Шина событий недоступна: {e}')
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            #  События за время разрыва потеряны: все процессы сбрасывают
+            #  кэши, клиенты перечитывают данные.
+            await self.publish({'event': RESYNC_EVENT, 'data': {}})
+            return
+
+    async def publish(self, message: dict) -> None:
+        if self._connection is None:
+            logger.warning('Шина событий недоступна, событие только локально.')
+            self._dispatch(message)
+            return
+
+        #  Событие придет обратно через LISTEN, как и в другие процессы.
+        async with self._lock:
+            for payload in split_payload(message):
+                await self._connection.execute(
+                    'SELECT pg_notify($1, $2)', self.channel, payload
+                )
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f'Некорректное событие в канале: {payload}')
+            return
+        self._dispatch(message)
+
+
+def split_payload(message: dict, limit: int = MAX_NOTIFY_PAYLOAD) -> List[str]:
+    """Делит событие на части, помещающиеся в payload NOTIFY.
+
+    Делятся списки задач (tasks_created) и списки id (tasks_updated,
+    tasks_deleted). От слишком большой задачи остаются id и updated_at
+    с признаком truncated: клиент перечитывает ее через API.
+    """
+
+    payload = dump_json(message).decode()
+    if len(payload.encode()) <= limit:
+        return [payload]
+
+    data = message['data']
+    if isinstance(data, list):
+        items, rebuild = data, lambda part: part
+    elif isinstance(data, dict) and 'ids' in data:
+        items, rebuild = data['ids'], lambda part: {**data, 'ids': part}
+    elif isinstance(data, dict) and 'id' in data:
+        return [dump_json({**message, 'data': truncate_task(data)}).decode()]
+    else:
+        raise ValueError(f'Событие {message["event"]} слишком велико.')
+
+    if len(items) == 1 and isinstance(items[0], dict):
+        data = [truncate_task(items[0])]
+        return [dump_json({**message, 'data': data}).decode()]
+    if len(items) < 2:
+        raise ValueError(f'Событие {message["event"]} слишком велико.')
+    middle = len(items) // 2
+    return [
+        payload
+        for part in (items[:middle], items[middle:])
+        for payload in split_payload(
+            {**message, 'data': rebuild(part)}, limit
+        )
+    ]
+
+
+def truncate_task(task: dict) -> dict:
+    return {
+        **{key: task[key] for key in ('id', 'updated_at') if key in task},
+        'truncated': True,
+    }
+
+
+def create_event_bus(backend: Optional[str] = None) -> EventBus:
+    backend = backend or settings.event_bus
+    if backend == 'postgres':
+        if settings.debug_mode == 'local':
+            raise RuntimeError('Шина postgres недоступна на sqlite.')
+        return PostgresEventBus(
+            dsn=settings.database_url.replace('+asyncpg', ''),
+            channel=EVENT_BUS_CHANNEL,
+        )
+    return InProcessEventBus()
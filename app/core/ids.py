@@ -0,0 +1,37 @@
+import os
+import time
+import uuid
+
+from app.core.config import settings
+
+
+def uuid7() -> uuid.UUID:
+    """Генерирует UUIDv7 (RFC 9562): упорядоченный по времени создания.
+
+    48 старших бит - unix-время в миллисекундах, следующие 12 бит - доля
+    миллисекунды, остальное - случайные биты. Новые ключи попадают в
+    конец B-tree индекса, а не в случайные страницы, как uuid4.
+    """
+
+    nanoseconds = time.time_ns()
+    milliseconds, remainder = divmod(nanoseconds, 1_000_000)
+    sub_milliseconds = remainder * 4096 // 1_000_000
+
+    value = (milliseconds & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= sub_milliseconds << 64
+    value |= 0b10 << 62
+    value |= int.from_bytes(os.urandom(8), 'big') >> 2
+    return uuid.UUID(int=value)
+
+
+ID_GENERATORS = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+def generate_id() -> uuid.UUID:
+    """Генерирует первичный ключ генератором из настроек."""
+
+    return ID_GENERATORS[settings.id_generator]()
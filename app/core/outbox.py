@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.crud.task_changes import TaskChangeCRUD, task_changes
+
+logger = logging.getLogger(__name__)
+
+Publish = Callable[[dict], Awaitable[None]]
+
+
+class OutboxDispatcher:
+    """Фоновая рассылка событий из журнала изменений задач (outbox).
+
+    События пишутся в журнал в транзакции изменения, рассылаются пачками
+    и помечаются разосланными. Доставка - не менее одного раза: если
+    процесс остановится между рассылкой и отметкой, пачка будет разослана
+    повторно, клиенты отличают повторы по seq.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        changes: TaskChangeCRUD,
+        batch_size: int = settings.outbox_batch_size,
+        poll_interval: float = settings.outbox_poll_interval,
+    ):
+        self.session_factory = session_factory
+        self.changes = changes
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._publish: Optional[Publish] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.dispatched = 0
+        self.batches = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def notify(self) -> None:
+        """Будит рассылку после commit, не дожидаясь poll_interval"""
+
+        self._wakeup.set()
+
+    async def start(self, publish: Publish) -> None:
+        self._publish = publish
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Дожидается текущей пачки и рассылает оставшиеся события"""
+
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def dispatch(self) -> int:
+        """Рассылает одну пачку событий, возвращает ее размер"""
+
+        async with self.session_factory() as session:
+            changes = await self.changes.get_undispatched(
+                session, limit=self.batch_size
+            )
+            if not changes:
+                return 0
+            for change in changes:
+                await self._publish(change)
+            await self.changes.mark_dispatched(session, changes)
+            await session.commit()
+
+        self.dispatched += len(changes)
+        self.batches += 1
+        return len(changes)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            stopping = self._stopping
+            try:
+                if await self.dispatch() >= self.batch_size:
+                    continue
+            except Exception:
+                self.errors += 1
+                logger.exception('Ошибка рассылки событий из журнала.')
+            if stopping:
+                return
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.poll_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            'dispatched': self.dispatched,
+            'batches': self.batches,
+            'errors': self.errors,
+        }
+
+
+task_outbox = OutboxDispatcher(AsyncSessionLocal, task_changes)
+
+
+def get_task_outbox() -> Optional[OutboxDispatcher]:
+    """Рассылка из журнала, None - события рассылаются в запросе"""
+
+    return task_outbox if task_outbox.running else None
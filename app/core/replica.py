@@ -0,0 +1,251 @@
+import logging
+import sys
+from bisect import bisect_right, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.constants import TaskStatus
+from app.models.task_manager import Task
+from app.schemas.filters import TaskFilter
+from app.schemas.pagination import Pagination, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+#  Ключ сортировки списка: (created_at, id).
+OrderKey = Tuple[datetime, str]
+
+
+class TaskRecord:
+    """Компактная запись задачи в памяти процесса.
+
+    Записи не изменяются на месте: при обновлении задачи создается новая
+    запись, поэтому уже отданные читателям объекты остаются согласованными.
+    """
+
+    __slots__ = (
+        'id',
+        'name',
+        'description',
+        'status',
+        'created_at',
+        'updated_at',
+    )
+
+    def __init__(
+        self,
+        id,
+        name: str,
+        description: str,
+        status: TaskStatus,
+        created_at: datetime,
+        updated_at: datetime,
+    ):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.status = TaskStatus(status)
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @property
+    def key(self) -> str:
+        return str(self.id)
+
+    @property
+    def order_key(self) -> OrderKey:
+        return self.created_at, self.key
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class TaskReplica:
+    """Материализованная копия таблицы task в памяти процесса.
+
+    Первичный индекс - словарь по id. Вторичные индексы: отсортированные
+    по (created_at, id) ключи всех задач и задач каждого статуса, а также
+    словарь по имени в нижнем регистре. Копия локальна для процесса и
+    обновляется только операциями TaskCRUD этого же процесса.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._by_id: Dict[str, TaskRecord] = {}
+        self._by_name: Dict[str, str] = {}
+        self._order: List[OrderKey] = []
+        self._by_status: Dict[TaskStatus, List[OrderKey]] = {
+            task_status: [] for task_status in TaskStatus
+        }
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    async def load(self, session: AsyncSession) -> None:
+        """Загружает все задачи из БД, заменяя текущее содержимое"""
+
+        result = await session.execute(select(*Task.__table__.columns))
+        self.clear()
+        for row in result.mappings():
+            self._insert(TaskRecord(**row))
+        for keys in (self._order, *self._by_status.values()):
+            keys.sort()
+        self.loaded = True
+        logger.info(f'Реплика задач загружена: {len(self)} записей.')
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._by_name.clear()
+        self._order.clear()
+        for keys in self._by_status.values():
+            keys.clear()
+
+    def get(self, pk) -> Optional[TaskRecord]:
+        return self._by_id.get(str(pk))
+
+    def upsert(self, row: dict) -> None:
+        record = TaskRecord(
+            **{field: row[field] for field in TaskRecord.__slots__}
+        )
+        self.remove(record.key)
+        self._insert(record, ordered=True)
+
+    def remove(self, pk) -> None:
+        record = self._by_id.pop(str(pk), None)
+        if record is None:
+            return
+
+        self._by_name.pop(record.name.lower(), None)
+        self._discard(self._order, record.order_key)
+        self._discard(self._by_status[record.status], record.order_key)
+
+    def page(
+        self,
+        filters: Optional[TaskFilter] = None,
+        pagination: Pagination = Pagination(),
+    ) -> Tuple[List[TaskRecord], Optional[str]]:
+        """Страница задач с той же семантикой, что и CRUDBase.get_page"""
+
+        filters = filters.model_dump(exclude_none=True) if filters else {}
+
+        if 'name' in filters:
+            pk = self._by_name.get(filters.pop('name').lower())
+            keys = [self._by_id[pk].order_key] if pk else []
+        elif 'status' in filters:
+            keys = self._by_status[TaskStatus(filters['status'])]
+        else:
+            keys = self._order
+
+        start = 0
+        if pagination.cursor:
+            created_at, pk = pagination.cursor
+            start = bisect_right(keys, (created_at, str(pk)))
+
+        items = []
+        for _, pk in keys[start:]:
+            record = self._by_id[pk]
+            if all(
+                getattr(record, field) == value
+                for field, value in filters.items()
+            ):
+                items.append(record)
+                if len(items) > pagination.limit:
+                    break
+
+        next_cursor = None
+        if len(items) > pagination.limit:
+            items = items[: pagination.limit]
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        return items, next_cursor
+
+    def taken_names(self, names: Iterable[str]) -> Set[str]:
+        return {name.lower() for name in names} & self._by_name.keys()
+
+    async def verify(self, session: AsyncSession) -> dict:
+        """Сверяет реплику с БД и возвращает расхождения по id"""
+
+        result = await session.execute(select(*Task.__table__.columns))
+        rows = {
+            str(row['id']): TaskRecord(**row).as_tuple()
+            for row in result.mappings()
+        }
+
+        missing = rows.keys() - self._by_id.keys()
+        extra = self._by_id.keys() - rows.keys()
+        stale = [
+            pk
+            for pk in rows.keys() & self._by_id.keys()
+            if rows[pk] != self._by_id[pk].as_tuple()
+        ]
+        indexes_ok = (
+            len(self._order) == len(self._by_id) == len(self._by_name)
+            and sum(map(len, self._by_status.values())) == len(self._by_id)
+        )
+
+        report = {
+            'consistent': not (missing or extra or stale) and indexes_ok,
+            'missing': sorted(missing),
+            'extra': sorted(extra),
+            'stale': sorted(stale),
+            'indexes_ok': indexes_ok,
+        }
+        if not report['consistent']:
+            logger.warning(f'Реплика задач расходится с БД: {report}')
+        return report
+
+    def stats(self) -> dict:
+        return {
+            'loaded': self.loaded,
+            'size': len(self),
+            'memory_bytes': self.memory_usage(),
+        }
+
+    def memory_usage(self) -> int:
+        """Приблизительный объем памяти реплики в байтах"""
+
+        size = sum(
+            sys.getsizeof(container)
+            for container in (
+                self._by_id,
+                self._by_name,
+                self._order,
+                *self._by_status.values(),
+            )
+        )
+        for pk, record in self._by_id.items():
+            size += sys.getsizeof(record) + sys.getsizeof(pk)
+            size += sys.getsizeof(record.name)
+            size += sys.getsizeof(record.name.lower())
+            size += sys.getsizeof(record.description)
+            size += sys.getsizeof(record.created_at)
+            size += sys.getsizeof(record.updated_at)
+            #  Ключ сортировки хранится в двух списках.
+            size += 2 * sys.getsizeof(record.order_key)
+        return size
+
+    def _insert(self, record: TaskRecord, ordered: bool = False) -> None:
+        self._by_id[record.key] = record
+        self._by_name[record.name.lower()] = record.key
+
+        add = insort if ordered else list.append
+        add(self._order, record.order_key)
+        add(self._by_status[record.status], record.order_key)
+
+    @staticmethod
+    def _discard(keys: List[OrderKey], key: OrderKey) -> None:
+        position = bisect_right(keys, key) - 1
+        if position >= 0 and keys[position] == key:
+            del keys[position]
+
+
+task_replica = TaskReplica()
+
+
+def get_task_replica() -> Optional[TaskReplica]:
+    return task_replica if settings.task_replica else None
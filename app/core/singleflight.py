@@ -0,0 +1,88 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar('T')
+
+
+class FlightAbandoned(Exception):
+    """Ведущий запрос отменен, ожидающие повторяют запрос сами."""
+
+
+class SingleFlight:
+    """Объединяет одинаковые одновременные запросы в один.
+
+    Первый вызов с ключом выполняет запрос, остальные вызовы с тем же
+    ключом до его завершения ждут и получают тот же результат либо ту же
+    ошибку. Ключ - кортеж, первый элемент которого задает вид запроса.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                return await self._lead(key, fetch)
+
+            self.collapsed += 1
+            try:
+                return await asyncio.shield(flight)
+            except FlightAbandoned:
+                self.collapsed -= 1
+
+    def forget(self, key: Hashable) -> None:
+        """Новые вызовы с ключом не присоединятся к уже идущему запросу"""
+
+        self._flights.pop(key, None)
+
+    def forget_prefix(self, *prefix) -> None:
+        """Забывает все ключи, начинающиеся с prefix"""
+
+        for key in [
+            key for key in self._flights if key[: len(prefix)] == prefix
+        ]:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'collapsed': self.collapsed,
+        }
+
+    async def _lead(
+        self, key: Hashable, fetch: Callable[[], Awaitable[T]]
+    ) -> T:
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self.leaders += 1
+
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            flight.set_exception(FlightAbandoned())
+            raise
+        except Exception as error:
+            flight.set_exception(error)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            #  Ошибка считается полученной, даже если ожидающих не было.
+            flight.exception()
+
+
+task_flights = SingleFlight()
+
+
+def get_task_flights() -> Optional[SingleFlight]:
+    return task_flights if settings.task_single_flight else None
@@ -1,16 +1,39 @@
 import logging
 import uuid
 from datetime import datetime
-from typing import Generic, List, Optional, TypeVar, Union
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from fastapi import HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import (
+    RowMapping,
+    delete,
+    insert,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import MISSING, NOT_CACHED, LRUTTLCache
 from app.core.config import settings
+from app.core.constants import EXPORT_CHUNK_SIZE
 from app.core.db import Base
+from app.core.singleflight import SingleFlight
 from app.schemas.filters import TaskFilter
+from app.schemas.pagination import Pagination, encode_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +44,15 @@ UpdateSchemaType = TypeVar('UpdateSchemaType', bound=BaseModel)
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
-    def __init__(self, model):
+    def __init__(
+        self,
+        model,
+        cache: Optional[LRUTTLCache] = None,
+        flights: Optional[SingleFlight] = None,
+    ):
         self.model: ModelType = model
+        self.cache = cache
+        self.flights = flights
 
     async def set_id_type(self, pk: Union[uuid.UUID, str]):
         """Устанавливает тип для id в зависимости от используемой db"""
@@ -34,82 +64,388 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> List[Optional[ModelType]]:
         """Получает все записи по фильтру из БД"""
 
-        query = select(self.model)
+        query = self._select_columns()
         if filters:
             logger.info('Применение фильтров списка.')
             query = filters.filter(query)
 
         logger.info('Выполняется получение списка.')
-        result = await session.execute(query)
+        rows = await self._coalesce(
+            ('list', self.filters_key(filters)),
+            lambda: self._fetch_rows(session, query),
+        )
 
         logger.info('Список возвращен клиенту.')
-        return result.scalars().all()
+        return [self.model(**row) for row in rows]
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        filters: TaskFilter = None,
+        pagination: Pagination = Pagination(),
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Получает страницу записей по фильтру и курсор следующей"""
+
+        rows, next_cursor = await self.get_page_rows(
+            session, filters, pagination
+        )
+        return [self.model(**row) for row in rows], next_cursor
+
+    def after_cursor(self, created_at: datetime, pk):
+        """Условие keyset-пагинации: записи после (created_at, id).
+
+        Значения связываются с типами колонок: иначе на postgres id
+        уходит как VARCHAR, и сравнение с uuid не компилируется.
+        """
+
+        return tuple_(self.model.created_at, self.model.id) > tuple_(
+            created_at,
+            pk,
+            types=[self.model.created_at.type, self.model.id.type],
+        )
+
+    async def get_page_rows(
+        self,
+        session: AsyncSession,
+        filters: TaskFilter = None,
+        pagination: Pagination = Pagination(),
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Получает страницу колонок записей без создания ORM-объектов.
+
+        fields ограничивает набор колонок и должен включать id и created_at.
+        """
+
+        query = self._select_columns(fields).order_by(
+            self.model.created_at, self.model.id
+        )
+        if filters:
+            logger.info('Применение фильтров списка.')
+            query = filters.filter(query)
+
+        cursor = None
+        if pagination.cursor:
+            created_at, pk = pagination.cursor
+            pk = await self.set_id_type(pk)
+            cursor = (created_at, str(pk))
+            query = query.where(self.after_cursor(created_at, pk))
+
+        logger.info(f'Выполняется получение страницы из {pagination.limit}.')
+        query = query.limit(pagination.limit + 1)
+        rows = await self._coalesce(
+            (
+                'page',
+                self.filters_key(filters),
+                pagination.limit,
+                cursor,
+                fields,
+            ),
+            lambda: self._fetch_rows(session, query),
+        )
+
+        next_cursor = None
+        if len(rows) > pagination.limit:
+            rows = rows[: pagination.limit]
+            next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+        logger.info('Страница возвращена клиенту.')
+        return rows, next_cursor
+
+    async def stream_partitions(
+        self,
+        session: AsyncSession,
+        filters: TaskFilter = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        """Потоково читает записи по фильтру пачками через серверный курсор"""
+
+        query = select(*self.model.__table__.columns).order_by(
+            self.model.created_at, self.model.id
+        )
+        if filters:
+            logger.info('Применение фильтров выгрузки.')
+            query = filters.filter(query)
+
+        logger.info('Выполняется потоковая выгрузка.')
+        result = await session.stream(
+            query.execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.mappings().partitions():
+            yield partition
+
+    def raise_not_found(self, pk: Union[uuid.UUID, str]) -> None:
+        logger.warning(f'Объект с id "{pk}" не найден в БД.')
+
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Объект с id "{pk}" не найден',
+        )
 
     async def get_or_404(
         self, session: AsyncSession, pk: Union[uuid.UUID, str]
     ) -> Optional[ModelType]:
-        """Получает запись из БД по id либо 404"""
+        """Получает запись из кэша либо из БД по id, иначе 404"""
 
         logger.info(f'Установка типа для id "{pk}".')
         pk = await self.set_id_type(pk)
 
+        cached = self._get_cached(pk)
+        if cached is MISSING:
+            self.raise_not_found(pk)
+        if cached is not NOT_CACHED:
+            logger.info(f'Объект с id "{pk}" получен из кэша.')
+            return cached
+
         logger.info(f'Попытка получения объекта с id "{pk}" из БД.')
-        result = await session.execute(
-            select(self.model).where(self.model.id == pk)
+        version = self.cache.version if self.cache is not None else None
+        query = self._select_columns().where(self.model.id == pk)
+        rows = await self._coalesce(
+            ('get', str(pk)), lambda: self._fetch_rows(session, query)
         )
-        instance = result.scalars().first()
 
-        if not instance:
-            logger.warning(f'Объект с id "{pk}" не найден в БД.')
+        #  Пока шел запрос, запись могли изменить: прочитанное уже
+        #  устарело и в кэш не кладется.
+        fresh = self.cache is not None and self.cache.version == version
+        if not rows:
+            if fresh:
+                self.cache.set_missing(str(pk))
+            self.raise_not_found(pk)
 
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f'Объект с id "{pk}" не найден',
-            )
+        if fresh:
+            self.cache.set(str(pk), rows[0])
 
         logger.info(f'Объект с id "{pk}" получен и возвращен клиенту.')
-        return instance
+        return self.model(**rows[0])
+
+    async def get_version(
+        self, session: AsyncSession, pk: Union[uuid.UUID, str]
+    ) -> Optional[datetime]:
+        """Получает только updated_at записи, None - если записи нет"""
+
+        pk = await self.set_id_type(pk)
+        cached = self._get_cached(pk)
+        if cached is MISSING:
+            return None
+        if cached is not NOT_CACHED:
+            return cached.updated_at
+
+        return await session.scalar(
+            select(self.model.updated_at).where(self.model.id == pk)
+        )
+
+    async def get_row_or_404(
+        self,
+        session: AsyncSession,
+        pk: Union[uuid.UUID, str],
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict:
+        """Получает только колонки fields записи по id, иначе 404"""
+
+        if fields is None:
+            return self._to_dict(await self.get_or_404(session, pk))
+
+        pk = await self.set_id_type(pk)
+        cached = self._get_cached(pk)
+        if cached is MISSING:
+            self.raise_not_found(pk)
+        if cached is not NOT_CACHED:
+            return self._to_dict(cached)
+
+        #  Неполная строка не кэшируется.
+        query = self._select_columns(fields).where(self.model.id == pk)
+        rows = await self._coalesce(
+            ('get', str(pk), tuple(fields)),
+            lambda: self._fetch_rows(session, query),
+        )
+        if not rows:
+            self.raise_not_found(pk)
+        return rows[0]
+
+    def _select_columns(self, fields: Optional[Sequence[str]] = None):
+        columns = self.model.__table__.columns
+        if fields is None:
+            return select(*columns)
+        return select(*(columns[field] for field in fields))
+
+    async def _fetch_rows(self, session: AsyncSession, query) -> List[dict]:
+        result = await session.execute(query)
+        return [dict(row) for row in result.mappings()]
+
+    async def _coalesce(
+        self, key: Hashable, fetch: Callable[[], Awaitable[List[dict]]]
+    ) -> List[dict]:
+        """Объединяет одинаковые одновременные запросы чтения в один"""
+
+        if self.flights is None:
+            return await fetch()
+        return await self.flights.do(key, fetch)
+
+    @staticmethod
+    def filters_key(filters: Optional[TaskFilter]) -> tuple:
+        if not filters:
+            return ()
+        return tuple(sorted(filters.model_dump(exclude_none=True).items()))
+
+    def _get_cached(self, pk: Union[uuid.UUID, str]):
+        if self.cache is None:
+            return NOT_CACHED
+
+        cached = self.cache.get(str(pk))
+        if cached is MISSING or cached is NOT_CACHED:
+            return cached
+        #  Из кэша отдается новый объект, не привязанный к сессии.
+        return self.model(**cached)
+
+    def _to_dict(self, instance: ModelType) -> dict:
+        return {
+            column.key: getattr(instance, column.key)
+            for column in self.model.__table__.columns
+        }
 
     async def create(
         self,
         data: dict,
         session: AsyncSession,
+        commit: bool = True,
     ) -> ModelType:
         """Делает запись в БД на основе полученной информации"""
         instance = self.model(**data)
 
         session.add(instance)
-        await session.commit()
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
         await session.refresh(instance)
 
         return instance
 
+    async def bulk_create(
+        self,
+        data: List[dict],
+        session: AsyncSession,
+        commit: bool = True,
+    ) -> List[ModelType]:
+        """Делает пакетную запись в БД одним INSERT ... RETURNING"""
+
+        result = await session.scalars(
+            insert(self.model).returning(self.model), data
+        )
+        instances = result.all()
+        if commit:
+            await session.commit()
+
+        return instances
+
+    async def _bulk_criteria(
+        self,
+        statement,
+        filters: Optional[TaskFilter],
+        ids: Optional[List[Union[uuid.UUID, str]]],
+    ):
+        """Ограничивает массовый запрос фильтром и/или списком id"""
+
+        if filters:
+            statement = filters.filter(statement)
+        if ids is not None:
+            statement = statement.where(
+                self.model.id.in_([await self.set_id_type(pk) for pk in ids])
+            )
+        return statement
+
+    async def bulk_update(
+        self,
+        session: AsyncSession,
+        new_data: dict,
+        filters: Optional[TaskFilter] = None,
+        ids: Optional[List[Union[uuid.UUID, str]]] = None,
+        criteria: Sequence = (),
+        commit: bool = True,
+    ) -> List[Union[uuid.UUID, str]]:
+        """Обновляет записи по фильтру одним UPDATE ... RETURNING id.
+
+        criteria - дополнительные условия WHERE.
+        """
+
+        statement = await self._bulk_criteria(
+            update(self.model).where(*criteria), filters, ids
+        )
+        result = await session.execute(
+            statement.values(**new_data, updated_at=datetime.now()).returning(
+                self.model.id
+            )
+        )
+        updated_ids = result.scalars().all()
+        if commit:
+            await session.commit()
+
+        logger.info(f'Массово обновлено записей: {len(updated_ids)}.')
+        return updated_ids
+
+    async def bulk_delete(
+        self,
+        session: AsyncSession,
+        filters: Optional[TaskFilter] = None,
+        ids: Optional[List[Union[uuid.UUID, str]]] = None,
+        commit: bool = True,
+    ) -> List[Union[uuid.UUID, str]]:
+        """Удаляет записи по фильтру одним DELETE ... RETURNING id"""
+
+        statement = await self._bulk_criteria(
+            delete(self.model), filters, ids
+        )
+        result = await session.execute(statement.returning(self.model.id))
+        deleted_ids = result.scalars().all()
+        if commit:
+            await session.commit()
+
+        logger.info(f'Массово удалено записей: {len(deleted_ids)}.')
+        return deleted_ids
+
     async def update(
         self,
-        instance: ModelType,
+        pk: Union[uuid.UUID, str],
         new_data: dict,
         session: AsyncSession,
-    ) -> ModelType:
-        """Обновляет запись в БД"""
+        *criteria,
+        commit: bool = True,
+    ) -> Optional[ModelType]:
+        """Обновляет запись в БД одним UPDATE ... RETURNING"""
 
-        for field, value in new_data.items():
-            if hasattr(instance, field):
-                setattr(instance, field, value)
+        pk = await self.set_id_type(pk)
+        values = {
+            field: value
+            for field, value in new_data.items()
+            if hasattr(self.model, field)
+        }
 
-        instance.updated_at = datetime.now()
+        result = await session.execute(
+            update(self.model)
+            .where(self.model.id == pk, *criteria)
+            .values(**values, updated_at=datetime.now())
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        instance = result.scalars().first()
+        if commit:
+            await session.commit()
 
-        await session.commit()
-        await session.refresh(instance)
         return instance
 
     async def delete(
         self,
-        instance: ModelType,
+        pk: Union[uuid.UUID, str],
         session: AsyncSession,
-    ) -> ModelType:
-        """Удаляет запись из БД"""
+        commit: bool = True,
+    ) -> Optional[ModelType]:
+        """Удаляет запись из БД одним DELETE ... RETURNING"""
 
-        await session.delete(instance)
-        await session.commit()
+        pk = await self.set_id_type(pk)
+        result = await session.execute(
+            delete(self.model).where(self.model.id == pk).returning(self.model)
+        )
+        instance = result.scalars().first()
+        if commit:
+            await session.commit()
 
         return instance
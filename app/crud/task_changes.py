@@ -0,0 +1,180 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Union
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.constants import (
+    CHANGES_GAP_GRACE,
+    CHANGES_PRUNE_EVERY,
+    MAX_CHANGES_PAGE,
+)
+from app.models.task_change import TaskChange
+
+logger = logging.getLogger(__name__)
+
+#  Поля задачи, которые хранятся в журнале, как и в событиях триггера.
+COMPACT_TASK_FIELDS = ('id', 'name', 'status', 'updated_at')
+
+
+def compact_task(task: dict) -> dict:
+    return {
+        **{key: task[key] for key in COMPACT_TASK_FIELDS if key in task},
+        'truncated': True,
+    }
+
+
+def compact_change(data: Union[dict, list]) -> Union[dict, list]:
+    """Данные изменения для хранения в журнале: задачи без описания.
+
+    Пакетные события с id и числом импортированных задач уже компактны.
+    """
+
+    if isinstance(data, list):
+        return [compact_task(task) for task in data]
+    if 'id' in data:
+        return compact_task(data)
+    return data
+
+
+class TaskChangeCRUD:
+    """Журнал изменений задач с монотонным номером (seq).
+
+    Изменение записывается в транзакции самой операции над задачами, до
+    ее commit, поэтому журнал не расходится с таблицей task. Записи
+    старше retention секунд удаляются, последняя запись сохраняется.
+    Полные данные события хранятся только до рассылки, затем остаются
+    id, имя, статус и updated_at задач с признаком truncated.
+    """
+
+    def __init__(
+        self,
+        model=TaskChange,
+        retention: int = settings.task_changes_retention,
+    ):
+        self.model = model
+        self.retention = retention
+
+    async def append(
+        self,
+        session: AsyncSession,
+        event: str,
+        data: Union[dict, list],
+        dispatched: bool = False,
+    ) -> int:
+        """Добавляет изменение без commit и возвращает его номер.
+
+        dispatched - событие рассылается самим запросом, а не из outbox.
+        """
+
+        now = datetime.now()
+        seq = await session.scalar(
+            insert(self.model)
+            .values(
+                event=event,
+                data=compact_change(data) if dispatched else data,
+                created_at=now,
+                dispatched_at=now if dispatched else None,
+            )
+            .returning(self.model.id)
+        )
+        if seq % CHANGES_PRUNE_EVERY == 0:
+            await self.prune(session, seq)
+        return seq
+
+    async def prune(self, session: AsyncSession, last_seq: int) -> None:
+        cutoff = datetime.now() - timedelta(seconds=self.retention)
+        result = await session.execute(
+            delete(self.model).where(
+                self.model.id < last_seq,
+                self.model.created_at < cutoff,
+                self.model.dispatched_at.is_not(None),
+            )
+        )
+        logger.info(f'Удалено старых изменений задач: {result.rowcount}.')
+
+    async def get_undispatched(
+        self, session: AsyncSession, limit: int
+    ) -> List[dict]:
+        """Неразосланные изменения по возрастанию номера.
+
+        На postgres строки блокируются до конца транзакции, и рассылки
+        других процессов их пропускают.
+        """
+
+        result = await session.execute(
+            select(self.model.id, self.model.event, self.model.data)
+            .where(self.model.dispatched_at.is_(None))
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return [
+            {'event': event, 'data': data, 'seq': seq}
+            for seq, event, data in result.all()
+        ]
+
+    async def mark_dispatched(
+        self, session: AsyncSession, changes: List[dict]
+    ) -> None:
+        """Помечает изменения разосланными и сжимает их данные"""
+
+        now = datetime.now()
+        await session.execute(
+            update(self.model),
+            [
+                {
+                    'id': change['seq'],
+                    'data': compact_change(change['data']),
+                    'dispatched_at': now,
+                }
+                for change in changes
+            ],
+        )
+
+    async def get_since(
+        self,
+        session: AsyncSession,
+        since: int,
+        limit: int = MAX_CHANGES_PAGE,
+    ) -> Optional[List[dict]]:
+        """Изменения с номером больше since по возрастанию номера.
+
+        None - часть изменений после since уже удалена из журнала, клиенту
+        нужно перечитать задачи целиком. Номера выдаются до commit, поэтому
+        на postgres изменение с большим номером может стать видно раньше
+        меньшего: чтение останавливается на свежем пропуске в номерах.
+        """
+
+        first = await session.scalar(select(func.min(self.model.id)))
+        if first is not None and since < first - 1:
+            return None
+
+        result = await session.execute(
+            select(
+                self.model.id,
+                self.model.event,
+                self.model.data,
+                self.model.created_at,
+            )
+            .where(self.model.id > since)
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        grace = datetime.now() - timedelta(seconds=CHANGES_GAP_GRACE)
+        changes, expected = [], since + 1
+        for seq, event, data, created_at in result.all():
+            if seq != expected and created_at > grace:
+                break
+            changes.append({'event': event, 'data': data, 'seq': seq})
+            expected = seq + 1
+        return changes
+
+
+task_changes = TaskChangeCRUD()
+
+
+def get_task_changes() -> TaskChangeCRUD:
+    return task_changes
@@ -1,75 +1,293 @@
-from typing import Optional
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import (
+    AsyncIterator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    func,
+    insert,
+    select,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
 from app.api.endpoints.websocket import (
     ConnectionManager,
     get_connection_manager,
 )
+from app.core.cache import (
+    Generation,
+    LRUTTLCache,
+    get_task_cache,
+    get_task_generation,
+)
+from app.core.config import settings
+from app.core.constants import (
+    IMPORT_CHUNK_SIZE,
+    MAX_IMPORT_REJECTED_REPORT,
+    MAX_TASK_NAME_LENGTH,
+    TaskStatus,
+)
+from app.core.ids import generate_id
+from app.core.outbox import OutboxDispatcher, get_task_outbox
+from app.core.replica import TaskRecord, TaskReplica, get_task_replica
+from app.core.singleflight import SingleFlight, get_task_flights
 from app.crud.base import CRUDBase
+from app.crud.task_changes import TaskChangeCRUD, get_task_changes
 from app.models.task_manager import Task
+from app.schemas.filters import TaskFilter
+from app.schemas.pagination import Pagination
 from app.schemas.task_manager import CreateTaskSchema, UpdateTaskSchema
+from app.utils.task_import import ImportRecord
+
+logger = logging.getLogger(__name__)
+
+STATUS_TRANSITIONS = {
+    TaskStatus.CREATED: [TaskStatus.IN_PROGRESS],
+    TaskStatus.IN_PROGRESS: [TaskStatus.COMPLETED],
+    TaskStatus.COMPLETED: [TaskStatus.IN_PROGRESS],
+}
+
+#  Временная таблица для загрузки импорта перед слиянием с task.
+task_import_table = Table(
+    'task_import',
+    MetaData(),
+    Column('record_no', Integer, nullable=False),
+    Column('id', Task.__table__.c.id.type, nullable=False),
+    Column('name', String(MAX_TASK_NAME_LENGTH), nullable=False),
+    Column('description', Text(), nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    prefixes=['TEMPORARY'],
+)
 
 
 class TaskCRUD(CRUDBase[Task, CreateTaskSchema, UpdateTaskSchema]):
 
-    def __init__(self, model, manager: ConnectionManager):
-        super().__init__(model)
+    def __init__(
+        self,
+        model,
+        manager: ConnectionManager,
+        cache: Optional[LRUTTLCache] = None,
+        replica: Optional[TaskReplica] = None,
+        flights: Optional[SingleFlight] = None,
+        generation: Optional[Generation] = None,
+        changes: Optional[TaskChangeCRUD] = None,
+        outbox: Optional[OutboxDispatcher] = None,
+    ):
+        super().__init__(model, cache=cache, flights=flights)
         self.connection_manager = manager
+        self.replica = replica
+        self.generation = generation
+        self.changes = changes
+        #  Рассылка из журнала работает только вместе с журналом.
+        self.outbox = outbox if changes is not None else None
+
+    @property
+    def replica_ready(self) -> bool:
+        return self.replica is not None and self.replica.loaded
+
+    async def get_or_404(
+        self, session: AsyncSession, pk: Union[uuid.UUID, str]
+    ) -> Union[Task, TaskRecord]:
+        if not self.replica_ready:
+            return await super().get_or_404(session=session, pk=pk)
+
+        record = self.replica.get(pk)
+        if record is None:
+            self.raise_not_found(pk)
+        return record
+
+    async def get_version(
+        self, session: AsyncSession, pk: Union[uuid.UUID, str]
+    ) -> Optional[datetime]:
+        if not self.replica_ready:
+            return await super().get_version(session=session, pk=pk)
+
+        record = self.replica.get(pk)
+        return record.updated_at if record else None
+
+    async def get_row_or_404(
+        self,
+        session: AsyncSession,
+        pk: Union[uuid.UUID, str],
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict:
+        if not self.replica_ready:
+            return await super().get_row_or_404(session, pk, fields)
+
+        record = await self.get_or_404(session, pk)
+        return record.as_dict()
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        filters: TaskFilter = None,
+        pagination: Pagination = Pagination(),
+    ) -> Tuple[List[Union[Task, TaskRecord]], Optional[str]]:
+        if not self.replica_ready:
+            return await super().get_page(session, filters, pagination)
+
+        logger.info('Страница задач получена из реплики.')
+        return self.replica.page(filters, pagination)
+
+    async def get_page_rows(
+        self,
+        session: AsyncSession,
+        filters: TaskFilter = None,
+        pagination: Pagination = Pagination(),
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        if not self.replica_ready:
+            return await super().get_page_rows(
+                session, filters, pagination, fields
+            )
+
+        records, next_cursor = await self.get_page(
+            session, filters, pagination
+        )
+        return [record.as_dict() for record in records], next_cursor
+
+    def _sync_replica(
+        self,
+        upserted: Iterable[dict] = (),
+        deleted: Iterable[Union[uuid.UUID, str]] = (),
+    ) -> None:
+        """Применяет к реплике изменения, зафиксированные в БД"""
+
+        if not self.replica_ready:
+            return
+        for row in upserted:
+            self.replica.upsert(row)
+        for pk in deleted:
+            self.replica.remove(pk)
+
+    async def _select_rows(
+        self, session: AsyncSession, *criteria
+    ) -> List[dict]:
+        result = await session.execute(
+            select(*self.model.__table__.columns).where(*criteria)
+        )
+        return result.mappings().all()
 
     def is_valid_status_transition(self, old: str, new: str) -> bool:
-        transitions = {
-            'Создано': ['В работе'],
-            'В работе': ['Завершено'],
-            'Завершено': ['В работе'],
-        }
-        return new in transitions.get(old)
+        return TaskStatus(new) in STATUS_TRANSITIONS.get(TaskStatus(old))
 
-    async def _generate_br_data(self, instance: Task) -> dict:
+    def get_previous_statuses(self, new: str) -> List[TaskStatus]:
+        """Статусы, из которых допустим переход в new"""
+
+        return [
+            old
+            for old, transitions in STATUS_TRANSITIONS.items()
+            if new in transitions
+        ]
+
+    def _task_payload(self, instance: Task) -> dict:
         return {
-            'data': {
-                'id': str(instance.id),
-                'name': instance.name,
-                'status': instance.status,
-                'description': instance.description,
-                'updated_at': instance.updated_at.isoformat(),
-            },
+            'id': str(instance.id),
+            'name': instance.name,
+            'status': instance.status,
+            'description': instance.description,
+            'updated_at': instance.updated_at.isoformat(),
         }
 
+    async def _commit(
+        self, session: AsyncSession, event: str, data: Union[dict, list]
+    ) -> dict:
+        """Записывает изменение в журнал и фиксирует транзакцию.
+
+        Возвращает событие для рассылки, с номером изменения seq, если
+        журнал включен.
+        """
+
+        message = {'event': event, 'data': data}
+        if self.changes is not None:
+            message['seq'] = await self.changes.append(
+                session, event, data, dispatched=self.outbox is None
+            )
+        await session.commit()
+        return message
+
+    async def _publish(self, message: dict) -> None:
+        """Обновляет кэш и рассылает событие об изменении задач.
+
+        При включенном outbox событие уже записано в журнал, и запрос
+        только будит фоновую рассылку.
+        """
+
+        invalidate_caches(
+            message['event'],
+            message['data'],
+            self.cache,
+            self.flights,
+            self.generation,
+        )
+        if self.outbox is not None:
+            self.outbox.notify()
+            return
+        await self.connection_manager.broadcast(message)
+
     async def update(
         self,
-        instance: Task,
+        pk: Union[uuid.UUID, str],
         new_data: dict,
         session: AsyncSession,
     ) -> Task:
 
-        if 'name' in new_data:
-            await self.check_unique_name(
-                session, name=new_data['name'], exclude_id=instance.id
-            )
-
+        pk = await self.set_id_type(pk)
+        criteria = []
         if 'status' in new_data:
-            old_status = instance.status
-            new_status = new_data['status']
-
-            if not self.is_valid_status_transition(old_status, new_status):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f'Недопустимый переход статуса: '
-                    f'{old_status} -> {new_status}',
+            #  Переход статуса проверяется в WHERE самого UPDATE.
+            criteria.append(
+                self.model.status.in_(
+                    self.get_previous_statuses(new_data['status'])
                 )
+            )
 
-        updated_task: Task = await super().update(
-            instance=instance,
-            new_data=new_data,
-            session=session,
-        )
+        try:
+            updated_task: Optional[Task] = await super().update(
+                pk, new_data, session, *criteria, commit=False
+            )
+        except IntegrityError:
+            await self.raise_name_taken(session, name=new_data.get('name'))
+
+        if updated_task is None:
+            #  Дополнительный запрос только на пути ошибки. Читается из БД,
+            #  а не из кэша или реплики: они могут быть устаревшими.
+            current_status = await session.scalar(
+                select(self.model.status).where(self.model.id == pk)
+            )
+            if current_status is None or 'status' not in new_data:
+                self.raise_not_found(pk)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f'Недопустимый переход статуса: '
+                f'{TaskStatus(current_status).value} -> '
+                f'{new_data.get("status")}',
+            )
 
-        br_data = await self._generate_br_data(updated_task)
-        br_data['event'] = 'task_updated'
-        await self.connection_manager.broadcast(br_data)
+        message = await self._commit(
+            session, 'task_updated', self._task_payload(updated_task)
+        )
+        self._sync_replica(upserted=[self._to_dict(updated_task)])
+        await self._publish(message)
 
         return updated_task
 
@@ -79,52 +297,437 @@ class TaskCRUD(CRUDBase[Task, CreateTaskSchema, UpdateTaskSchema]):
         session: AsyncSession,
     ) -> Task:
 
-        await self.check_unique_name(session, name=data['name'])
-
-        new_task = await super().create(data=data, session=session)
+        try:
+            new_task = await super().create(
+                data=data, session=session, commit=False
+            )
+        except IntegrityError:
+            await self.raise_name_taken(session, name=data['name'])
 
-        br_data = await self._generate_br_data(new_task)
-        br_data['event'] = 'task_created'
-        await self.connection_manager.broadcast(br_data)
+        message = await self._commit(
+            session, 'task_created', self._task_payload(new_task)
+        )
+        self._sync_replica(upserted=[self._to_dict(new_task)])
+        await self._publish(message)
 
         return new_task
 
-    async def delete(
+    async def bulk_create(
         self,
-        instance: Task,
+        data: List[dict],
         session: AsyncSession,
+    ) -> Tuple[List[Task], List[dict]]:
+
+        taken_names = await self.get_taken_names(
+            session, names=(item['name'] for item in data)
+        )
+
+        accepted, errors, batch_names = [], [], set()
+        for index, item in enumerate(data):
+            name = item['name']
+            if name.lower() in taken_names:
+                detail = f'Имя \'{name}\' недоступно.'
+            elif name.lower() in batch_names:
+                detail = f'Имя \'{name}\' повторяется в пакете.'
+            else:
+                batch_names.add(name.lower())
+                accepted.append(item)
+                continue
+            errors.append({'index': index, 'name': name, 'detail': detail})
+
+        if not accepted:
+            return [], errors
+
+        try:
+            new_tasks = await super().bulk_create(
+                data=accepted, session=session, commit=False
+            )
+        except IntegrityError:
+            await session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Имена задач заняты параллельным запросом, '
+                'повторите попытку.',
+            )
+
+        message = await self._commit(
+            session,
+            'tasks_created',
+            [self._task_payload(task) for task in new_tasks],
+        )
+        self._sync_replica(upserted=map(self._to_dict, new_tasks))
+        await self._publish(message)
+
+        return new_tasks, errors
+
+    async def bulk_import(
+        self,
+        session: AsyncSession,
+        records: AsyncIterator[ImportRecord],
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> dict:
+        """Потоково загружает записи во временную таблицу и сливает с task"""
+
+        started = time.perf_counter()
+        rejected = []
+        connection = await session.connection()
+
+        try:
+            await connection.run_sync(
+                task_import_table.drop, checkfirst=True
+            )
+            await connection.run_sync(task_import_table.create)
+
+            received, staged = await self._stage_records(
+                connection, records, chunk_size, rejected
+            )
+            logger.info(f'Загружено во временную таблицу: {staged}.')
+            imported = await self._merge_staged(connection)
+            conflicts = await self._get_unmerged(
+                connection, limit=MAX_IMPORT_REJECTED_REPORT
+            )
+            imported_rows = []
+            if imported and self.replica_ready:
+                imported_rows = await self._select_rows(
+                    session,
+                    self.model.id.in_(select(task_import_table.c.id)),
+                )
+
+            await connection.run_sync(task_import_table.drop)
+            if imported:
+                message = await self._commit(
+                    session, 'tasks_imported', {'count': imported}
+                )
+            else:
+                await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+        elapsed = time.perf_counter() - started
+        logger.info(f'Импортировано {imported} из {received} за {elapsed}с.')
+
+        if imported:
+            self._sync_replica(upserted=imported_rows)
+            await self._publish(message)
+
+        rejected_count = received - imported
+        rejected.extend(
+            {
+                'row': number,
+                'name': name,
+                'detail': f'Имя \'{name}\' недоступно.',
+            }
+            for number, name in conflicts
+        )
+        rejected.sort(key=lambda row: row['row'])
+
+        return {
+            'received': received,
+            'imported': imported,
+            'rejected_count': rejected_count,
+            'rejected': rejected[:MAX_IMPORT_REJECTED_REPORT],
+            'elapsed': elapsed,
+            'rows_per_second': received / elapsed if elapsed else 0.0,
+        }
+
+    def _new_id(self):
+        #  Для sqlite id хранится строкой, для postgres - uuid.
+        pk = generate_id()
+        return str(pk) if settings.debug_mode == 'local' else pk
+
+    async def _stage_records(
+        self,
+        connection: AsyncConnection,
+        records: AsyncIterator[ImportRecord],
+        chunk_size: int,
+        rejected: List[dict],
+    ) -> Tuple[int, int]:
+        """Загружает записи во временную таблицу пачками.
+
+        Отклоненные записи попадают в rejected не больше
+        MAX_IMPORT_REJECTED_REPORT, чтобы файл с ошибками не держался в
+        памяти целиком: их число - received - imported. Возвращает число
+        прочитанных и загруженных записей.
+        """
+
+        received, staged, chunk = 0, 0, []
+        async for number, task_data, error in records:
+            received += 1
+            if error:
+                if len(rejected) < MAX_IMPORT_REJECTED_REPORT:
+                    rejected.append(
+                        {'row': number, 'name': None, 'detail': error}
+                    )
+                continue
+
+            chunk.append((number, self._new_id(), *task_data, datetime.now()))
+            if len(chunk) >= chunk_size:
+                await self._stage_chunk(connection, chunk)
+                staged += len(chunk)
+                chunk = []
+
+        if chunk:
+            await self._stage_chunk(connection, chunk)
+            staged += len(chunk)
+        return received, staged
+
+    async def _stage_chunk(
+        self, connection: AsyncConnection, rows: List[tuple]
     ) -> None:
-        deleted_task = await super().delete(instance=instance, session=session)
+        columns = task_import_table.c.keys()
+
+        if settings.debug_mode == 'local':
+            #  Для sqlite: executemany пачкой.
+            await connection.execute(
+                insert(task_import_table),
+                [dict(zip(columns, row)) for row in rows],
+            )
+            return
+
+        #  Для postgres: бинарный COPY через asyncpg.
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            task_import_table.name, records=rows, columns=columns
+        )
 
-        br_data = await self._generate_br_data(deleted_task)
-        br_data['event'] = 'task_deleted'
-        await self.connection_manager.broadcast(br_data)
+    async def _merge_staged(self, connection: AsyncConnection) -> int:
+        """Переносит в task первые вхождения свободных имен одним запросом"""
 
-    async def check_unique_name(
+        staging = task_import_table.c
+        ranked = select(
+            task_import_table,
+            func.row_number()
+            .over(
+                partition_by=func.lower(staging.name),
+                order_by=staging.record_no,
+            )
+            .label('rank'),
+        ).subquery()
+        name_taken = (
+            select(self.model.id)
+            .where(
+                func.lower(self.model.name) == func.lower(ranked.c.name)
+            )
+            .exists()
+        )
+
+        result = await connection.execute(
+            insert(self.model.__table__).from_select(
+                ['id', 'name', 'description', 'created_at', 'updated_at'],
+                select(
+                    ranked.c.id,
+                    ranked.c.name,
+                    ranked.c.description,
+                    ranked.c.created_at,
+                    ranked.c.created_at,
+                ).where(ranked.c.rank == 1, ~name_taken),
+            )
+        )
+        return result.rowcount
+
+    async def _get_unmerged(
+        self, connection: AsyncConnection, limit: int
+    ) -> List[Tuple[int, str]]:
+        staging = task_import_table.c
+        result = await connection.execute(
+            select(staging.record_no, staging.name)
+            .where(
+                ~select(self.model.id)
+                .where(self.model.id == staging.id)
+                .exists()
+            )
+            .order_by(staging.record_no)
+            .limit(limit)
+        )
+        return result.all()
+
+    async def bulk_update_status(
         self,
         session: AsyncSession,
-        name: str,
-        exclude_id: Optional[str] = None,
+        new_status: str,
+        filters: Optional[TaskFilter] = None,
+        ids: Optional[List[uuid.UUID]] = None,
+    ) -> List[Union[uuid.UUID, str]]:
+
+        updated_ids = await super().bulk_update(
+            session,
+            {'status': new_status},
+            filters=filters,
+            ids=ids,
+            criteria=[
+                self.model.status.in_(self.get_previous_statuses(new_status))
+            ],
+            commit=False,
+        )
+
+        if not updated_ids:
+            await session.commit()
+            return updated_ids
+
+        message = await self._commit(
+            session,
+            'tasks_updated',
+            {'ids': [str(pk) for pk in updated_ids], 'status': new_status},
+        )
+        if self.replica_ready:
+            self._sync_replica(
+                upserted=await self._select_rows(
+                    session, self.model.id.in_(updated_ids)
+                )
+            )
+        await self._publish(message)
+
+        return updated_ids
+
+    async def bulk_delete(
+        self,
+        session: AsyncSession,
+        filters: Optional[TaskFilter] = None,
+        ids: Optional[List[uuid.UUID]] = None,
+    ) -> List[Union[uuid.UUID, str]]:
+
+        deleted_ids = await super().bulk_delete(
+            session, filters, ids, commit=False
+        )
+
+        if not deleted_ids:
+            await session.commit()
+            return deleted_ids
+
+        message = await self._commit(
+            session, 'tasks_deleted', {'ids': [str(pk) for pk in deleted_ids]}
+        )
+        self._sync_replica(deleted=deleted_ids)
+        await self._publish(message)
+
+        return deleted_ids
+
+    async def delete(
+        self,
+        pk: Union[uuid.UUID, str],
+        session: AsyncSession,
     ) -> None:
+        deleted_task = await super().delete(
+            pk=pk, session=session, commit=False
+        )
+        if deleted_task is None:
+            self.raise_not_found(pk)
+
+        message = await self._commit(
+            session, 'task_deleted', self._task_payload(deleted_task)
+        )
+        self._sync_replica(deleted=[deleted_task.id])
+        await self._publish(message)
+
+    async def raise_name_taken(self, session: AsyncSession, name: str):
+        """Откатывает транзакцию после конфликта уникального индекса имени"""
 
-        query = select(self.model).where(
-            func.lower(self.model.name) == func.lower(name)
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Имя \'{name}\' недоступно.',
         )
 
-        if exclude_id is not None:
-            query = query.where(self.model.id != exclude_id)
+    async def get_taken_names(
+        self,
+        session: AsyncSession,
+        names: Iterable[str],
+    ) -> Set[str]:
+        """Возвращает занятые имена из набора одним запросом"""
 
-        result = await session.execute(query)
-        db_obj = result.scalars().first()
+        if self.replica_ready:
+            return self.replica.taken_names(names)
 
-        if db_obj:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f'Имя \'{name}\' недоступно.',
+        query = select(self.model.name).where(
+            func.lower(self.model.name).in_(
+                [func.lower(name) for name in names]
             )
+        )
+        result = await session.scalars(query)
+        return {name.lower() for name in result}
+
+
+def event_ids(event: str, data: Union[dict, list]) -> Optional[List[str]]:
+    """id задач из события, None - если они неизвестны"""
+
+    if event == 'tasks_created':
+        return [task['id'] for task in data]
+    if 'ids' in data:
+        return data['ids']
+    if 'id' in data:
+        return [data['id']]
+    #  tasks_imported, resync.
+    return None
+
+
+def invalidate_caches(
+    event: str,
+    data: Union[dict, list],
+    cache: Optional[LRUTTLCache] = None,
+    flights: Optional[SingleFlight] = None,
+    generation: Optional[Generation] = None,
+) -> None:
+    """Сбрасывает кэши процесса, затронутые событием об изменении задач"""
+
+    if generation is not None:
+        generation.bump()
+
+    ids = event_ids(event, data)
+    if flights is not None:
+        #  Чтения, начатые до изменения, не достаются пришедшим после.
+        flights.forget_prefix('list')
+        flights.forget_prefix('page')
+        if ids is None:
+            flights.forget_prefix('get')
+        for pk in ids or ():
+            flights.forget_prefix('get', pk)
+
+    if cache is None:
+        return
+    if ids is None:
+        #  id задач неизвестны: сбрасываются в том числе отрицательные
+        #  записи.
+        cache.clear()
+        return
+    for pk in ids:
+        cache.invalidate(pk)
+        if event.endswith('deleted'):
+            cache.set_missing(pk)
+
+
+def handle_task_event(message: dict) -> None:
+    """Обработчик шины событий: событие могло прийти из другого процесса.
+
+    Для событий своего процесса сброс повторный, он идемпотентен:
+    _publish сбрасывает кэши сразу, не дожидаясь возврата события из шины.
+    """
+
+    invalidate_caches(
+        message['event'],
+        message['data'],
+        get_task_cache(),
+        get_task_flights(),
+        get_task_generation(),
+    )
 
 
 def get_task_crud(
     manager: ConnectionManager = Depends(get_connection_manager),
+    cache: LRUTTLCache = Depends(get_task_cache),
+    replica: Optional[TaskReplica] = Depends(get_task_replica),
+    flights: Optional[SingleFlight] = Depends(get_task_flights),
+    generation: Optional[Generation] = Depends(get_task_generation),
+    changes: TaskChangeCRUD = Depends(get_task_changes),
+    outbox: Optional[OutboxDispatcher] = Depends(get_task_outbox),
 ) -> TaskCRUD:
-    return TaskCRUD(model=Task, manager=manager)
+    return TaskCRUD(
+        model=Task,
+        manager=manager,
+        cache=cache,
+        replica=replica,
+        flights=flights,
+        generation=generation,
+        changes=changes,
+        outbox=outbox,
+    )
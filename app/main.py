@@ -1,10 +1,48 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.endpoints.websocket import manager
 from app.api.routers import main_router
-from app.core.config import setup_logging
+from app.core.config import settings, setup_logging
+from app.core.db import AsyncSessionLocal
+from app.core.outbox import task_outbox
+from app.core.replica import task_replica
+from app.crud.task_manager import handle_task_event
+from app.schemas.pagination import NEXT_CURSOR_HEADER
+from app.utils.etag import ETAG_HEADER
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.task_replica and (
+        settings.event_bus != 'memory' or settings.web_concurrency > 1
+    ):
+        #  Из шины приходят неполные задачи (без описания, пакеты - только
+        #  id), применить их к реплике нельзя, а шина в памяти не видит
+        #  других воркеров. Реплика отдавала бы старые данные после
+        #  изменений в других процессах.
+        raise RuntimeError(
+            'TASK_REPLICA работает только в одном процессе с EVENT_BUS='
+            'memory: реплика не видит изменений из других процессов.'
+        )
+    #  Кэши сбрасываются и по событиям, записанным другими процессами.
+    manager.bus.subscribe(handle_task_event)
+    await manager.bus.start()
+    if settings.task_replica:
+        async with AsyncSessionLocal() as session:
+            await task_replica.load(session)
+    if settings.task_outbox:
+        await task_outbox.start(manager.broadcast)
+    yield
+    await task_outbox.stop()
+    manager.close_all()
+    await manager.bus.stop()
+    task_replica.clear()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(main_router)
 
 logger = setup_logging()
@@ -15,4 +53,5 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
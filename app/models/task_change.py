@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    func,
+)
+
+from app.core.db import AppendOnlyBase
+
+
+class TaskChange(AppendOnlyBase):
+    """Журнал изменений задач: событие websocket и его номер.
+
+    Служит и outbox: событие рассылается фоновой задачей после commit.
+    После рассылки в журнале остаются только компактные данные.
+    """
+
+    __tablename__ = 'task_change'
+
+    #  Номер изменения, монотонно растет. На sqlite - INTEGER PRIMARY KEY
+    #  (rowid), номер не переиспользуется, пока последняя запись на месте.
+    id = Column(
+        BigInteger().with_variant(Integer, 'sqlite'),
+        primary_key=True,
+        autoincrement=True,
+        comment='Номер изменения',
+    )
+    created_at = Column(
+        DateTime,
+        default=datetime.now,
+        server_default=func.now(),
+        comment='Дата создания',
+    )
+    event = Column(String(32), nullable=False, comment='Тип события')
+    data = Column(JSON, nullable=False, comment='Данные события')
+    dispatched_at = Column(
+        DateTime, nullable=True, comment='Дата рассылки события'
+    )
+
+    __table_args__ = (
+        #  Для выборки неразосланных событий, частичный: их немного.
+        Index(
+            'ix_task_change_undispatched',
+            'id',
+            postgresql_where=dispatched_at.is_(None),
+            sqlite_where=dispatched_at.is_(None),
+        ),
+    )
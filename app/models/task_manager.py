@@ -1,6 +1,6 @@
-from sqlalchemy import CheckConstraint, Column, String, Text
+from sqlalchemy import Column, Enum, Index, String, Text, func
 
-from app.core.constants import MAX_TASK_NAME_LENGTH, MAX_TASK_STATUS_LENGTH
+from app.core.constants import MAX_TASK_NAME_LENGTH, TaskStatus
 from app.core.db import Base
 
 
@@ -8,23 +8,34 @@ class Task(Base):
 
     name = Column(
         String(MAX_TASK_NAME_LENGTH),
-        unique=True,
         nullable=False,
         comment='Название задачи',
     )
     description = Column(Text(), nullable=False, comment='Описание задачи')
+    #  На postgres - нативный ENUM (4 байта в строке и в индексах),
+    #  на sqlite - строка с CHECK-ограничением.
     status = Column(
-        String(MAX_TASK_STATUS_LENGTH),
-        index=True,
-        default='Создано',
+        Enum(
+            TaskStatus,
+            name='task_status',
+            values_callable=lambda statuses: [
+                status.value for status in statuses
+            ],
+            create_constraint=True,
+            validate_strings=True,
+        ),
+        default=TaskStatus.CREATED,
         nullable=False,
-        server_default='Создано',
+        server_default=TaskStatus.CREATED.value,
         comment='Статус выполнения задачи',
     )
 
     __table_args__ = (
-        CheckConstraint(
-            status.in_(['Создано', 'В работе', 'Завершено']),
-            name='check_status',
-        ),
+        #  Имя уникально без учета регистра. Индекс обслуживает и фильтр
+        #  по точному имени (TaskFilter.filter).
+        Index('ix_task_name_lower', func.lower(name), unique=True),
+        #  Для keyset-пагинации списка по (created_at, id).
+        Index('ix_task_created_at_id', 'created_at', 'id'),
+        #  Для фильтра по статусу с той же сортировкой списка.
+        Index('ix_task_status_created_at_id', 'status', 'created_at', 'id'),
     )
@@ -0,0 +1,65 @@
+from functools import lru_cache
+from typing import Optional, Tuple, Type
+
+from fastapi import HTTPException, Query
+from fastapi import status as http_status
+from pydantic import BaseModel, create_model
+
+from app.schemas.task_manager import GetTaskSchema
+
+TASK_FIELDS = tuple(GetTaskSchema.model_fields)
+#  Узкие колонки, которые читаются всегда: нужны для курсора и ETag.
+SERVICE_FIELDS = ('id', 'created_at', 'updated_at')
+
+
+def parse_fields(fields: str) -> Tuple[str, ...]:
+    """Разбирает список полей через запятую в порядке полей схемы."""
+
+    requested = {field.strip() for field in fields.split(',')} - {''}
+    unknown = requested - set(TASK_FIELDS)
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                f'Недопустимые поля: "{", ".join(sorted(unknown))}", '
+                f'выберите из: {", ".join(TASK_FIELDS)}'
+            ),
+        )
+    return tuple(field for field in TASK_FIELDS if field in requested)
+
+
+def select_fields(fields: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Колонки для SELECT: запрошенные поля и служебные."""
+
+    return tuple(
+        field
+        for field in TASK_FIELDS
+        if field in fields or field in SERVICE_FIELDS
+    )
+
+
+@lru_cache(maxsize=None)
+def partial_task_schema(fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Схема GetTaskSchema, сокращенная до запрошенных полей."""
+
+    return create_model(
+        'PartialGetTaskSchema',
+        __config__=GetTaskSchema.model_config,
+        **{
+            field: (info.annotation, ...)
+            for field, info in GetTaskSchema.model_fields.items()
+            if field in fields
+        },
+    )
+
+
+async def get_fields(
+    fields: Optional[str] = Query(
+        None,
+        description=(
+            'Поля ответа через запятую, например "id,name,status". '
+            'Неуказанные колонки не читаются из БД'
+        ),
+    ),
+) -> Optional[Tuple[str, ...]]:
+    return parse_fields(fields) if fields is not None else None
@@ -1,20 +1,14 @@
-from enum import Enum
 from typing import Optional
 
 from fastapi import HTTPException, Query, Request
 from fastapi import status as http_status
 from fastapi_filter.contrib.sqlalchemy import Filter
+from sqlalchemy import func
 
+from app.core.constants import TaskStatus
 from app.models.task_manager import Task
 
 
-class TaskStatus(str, Enum):
-
-    CREATED = 'Создано'
-    IN_PROGRESS = 'В работе'
-    COMPLETED = 'Завершено'
-
-
 class TaskFilter(Filter):
     status: Optional[TaskStatus] = None
     name: Optional[str] = None
@@ -25,29 +19,49 @@ class TaskFilter(Filter):
         ordering_field_name = 'created_at'
         search_field_name = None
 
+    def filter(self, query):
+        if self.name is None:
+            return super().filter(query)
+        #  Имя уникально без учета регистра, и ищется так же: по индексу
+        #  lower(name), отдельного индекса по name нет.
+        query = self.model_copy(update={'name': None}).filter(query)
+        return query.filter(func.lower(Task.name) == func.lower(self.name))
+
+
+FILTER_PARAMS = frozenset({'status', 'name', 'description'})
+
 
-async def validate_filters(
-    request: Request,
-    status: Optional[TaskStatus] = Query(None),
-    name: Optional[str] = Query(None),
-    description: Optional[str] = Query(None),
-) -> TaskFilter:
-    allowed_params = {
-        'status',
-        'name',
-        'description',
-    }
-    query_params = set(request.query_params.keys())
-
-    extra_params = query_params - allowed_params
-    if extra_params:
-        raise HTTPException(
-            status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f'Недопустимые параметры: "{extra_params}"',
+def filters_validator(*extra_params: str):
+    """Создает зависимость валидации фильтров с доп. query-параметрами."""
+
+    allowed_params = FILTER_PARAMS.union(extra_params)
+
+    async def validate(
+        request: Request,
+        status: Optional[TaskStatus] = Query(None),
+        name: Optional[str] = Query(
+            None, description='Точное имя задачи без учета регистра'
+        ),
+        description: Optional[str] = Query(None),
+    ) -> TaskFilter:
+        query_params = set(request.query_params.keys())
+
+        extra_params = query_params - allowed_params
+        if extra_params:
+            raise HTTPException(
+                status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f'Недопустимые параметры: "{extra_params}"',
+            )
+
+        return TaskFilter(
+            status=status,
+            name=name,
+            description=description,
         )
 
-    return TaskFilter(
-        status=status,
-        name=name,
-        description=description,
-    )
+    return validate
+
+
+validate_filters = filters_validator('limit', 'cursor', 'fields')
+validate_export_filters = filters_validator('format', 'gzip')
+validate_bulk_filters = filters_validator()
@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+from fastapi import HTTPException, Query
+from fastapi import status as http_status
+from pydantic import BaseModel
+
+from app.core.constants import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class Pagination(BaseModel):
+    """Параметры keyset-пагинации списка"""
+
+    limit: int = DEFAULT_PAGE_LIMIT
+    cursor: Optional[Tuple[datetime, str]] = None
+
+
+def encode_cursor(created_at: datetime, pk: Union[uuid.UUID, str]) -> str:
+    """Кодирует позицию (created_at, id) в непрозрачный курсор."""
+
+    raw = json.dumps([created_at.isoformat(), str(pk)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Декодирует курсор в позицию (created_at, id)."""
+
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        #  Курсор приходит от клиента и может быть подделан.
+        if not isinstance(created_at, str) or not isinstance(pk, str):
+            raise ValueError('Позиция курсора должна быть строками')
+        return datetime.fromisoformat(created_at), str(uuid.UUID(pk))
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(
+            status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f'Недопустимый курсор: "{cursor}"',
+        )
+
+
+async def get_pagination(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(None),
+) -> Pagination:
+    return Pagination(
+        limit=limit,
+        cursor=decode_cursor(cursor) if cursor else None,
+    )
@@ -1,18 +1,21 @@
 # Standart lib imports
+import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Any, List, Optional
 
 # Thirdparty imports
-from pydantic import UUID4, BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from app.core.constants import (
+    MAX_BULK_TASKS,
     MAX_TASK_DESCR_LENGTH,
     MAX_TASK_NAME_LENGTH,
     MIN_TASK_DESCR_LENGTH,
     MIN_TASK_NAME_LENGTH,
+    TaskStatus,
 )
 
-TASK_STATUSES = ('создано', 'в работе', 'завершено')
+TASK_STATUSES = {status.value.lower(): status for status in TaskStatus}
 
 
 class CreateTaskSchema(BaseModel):
@@ -26,13 +29,18 @@ class CreateTaskSchema(BaseModel):
     model_config = ConfigDict(extra='forbid')
 
 
+BulkCreateTaskSchema = Annotated[
+    List[CreateTaskSchema], Field(min_length=1, max_length=MAX_BULK_TASKS)
+]
+
+
 class GetTaskSchema(BaseModel):
     """Pydantic-схема для получения task"""
 
-    id: UUID4
+    id: uuid.UUID
     name: str
     description: str
-    status: str
+    status: TaskStatus
     created_at: datetime
     updated_at: datetime
 
@@ -43,18 +51,93 @@ class UpdateTaskSchema(BaseModel):
 
     name: Optional[str] = Field(None, max_length=MAX_TASK_NAME_LENGTH)
     description: Optional[str] = Field(None)
-    status: Optional[str] = Field(None)
+    status: Optional[TaskStatus] = Field(None)
 
     model_config = ConfigDict(extra='forbid')
 
-    @field_validator('status')
+    @field_validator('status', mode='before')
     @classmethod
     def validate_status(cls, value: Optional[str]):
         valid_statuses = TASK_STATUSES
 
+        if value is not None and not isinstance(value, str):
+            raise ValueError('Статус должен быть строкой')
         if value and value.lower() not in valid_statuses:
             raise ValueError(
                 f'{value} - недопустимый статус, '
                 f'выберите из: {" -- ".join(valid_statuses)}'
             )
-        return value
+        return valid_statuses[value.lower()] if value else value
+
+
+class BulkTaskErrorSchema(BaseModel):
+    """Pydantic-схема ошибки элемента пакетной операции"""
+
+    index: int
+    name: str
+    detail: str
+
+
+class BulkCreateTaskResultSchema(BaseModel):
+    """Pydantic-схема результата пакетного создания task"""
+
+    created: List[GetTaskSchema]
+    errors: List[BulkTaskErrorSchema]
+
+
+class ImportRejectedRowSchema(BaseModel):
+    """Pydantic-схема отклоненной записи импорта"""
+
+    row: int
+    name: Optional[str]
+    detail: str
+
+
+class ImportTasksResultSchema(BaseModel):
+    """Pydantic-схема результата импорта task из файла"""
+
+    received: int
+    imported: int
+    rejected_count: int
+    rejected: List[ImportRejectedRowSchema]
+    elapsed: float
+    rows_per_second: float
+
+
+class BulkStatusTaskSchema(BaseModel):
+    """Pydantic-схема массовой смены статуса task"""
+
+    status: TaskStatus
+    ids: Optional[List[uuid.UUID]] = Field(None, max_length=MAX_BULK_TASKS)
+
+    model_config = ConfigDict(extra='forbid')
+
+
+class BulkDeleteTaskSchema(BaseModel):
+    """Pydantic-схема массового удаления task"""
+
+    ids: Optional[List[uuid.UUID]] = Field(None, max_length=MAX_BULK_TASKS)
+
+    model_config = ConfigDict(extra='forbid')
+
+
+class BulkTaskIdsSchema(BaseModel):
+    """Pydantic-схема результата массовой операции над task"""
+
+    ids: List[uuid.UUID]
+    count: int
+
+
+class TaskChangeSchema(BaseModel):
+    """Pydantic-схема изменения task из журнала"""
+
+    seq: int
+    event: str
+    data: Any
+
+
+class TaskChangesSchema(BaseModel):
+    """Pydantic-схема страницы журнала изменений task"""
+
+    changes: List[TaskChangeSchema]
+    last_seq: int
@@ -0,0 +1,28 @@
+import uuid
+from typing import List, Literal, Set, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.core.constants import MAX_WS_TOPICS, TASK_EVENTS, TaskStatus
+
+Topic = Tuple[str, str]
+
+
+class ClientMessageSchema(BaseModel):
+    """Сообщение клиента websocket: подписка на события задач или pong"""
+
+    action: Literal['subscribe', 'unsubscribe', 'pong']
+    ids: List[uuid.UUID] = Field(default=[], max_length=MAX_WS_TOPICS)
+    statuses: List[TaskStatus] = Field(default=[], max_length=MAX_WS_TOPICS)
+    events: List[Literal[TASK_EVENTS]] = Field(
+        default=[], max_length=MAX_WS_TOPICS
+    )
+
+    model_config = ConfigDict(extra='forbid')
+
+    def topics(self) -> Set[Topic]:
+        return (
+            {('id', str(pk)) for pk in self.ids}
+            | {('status', status.value) for status in self.statuses}
+            | {('event', event) for event in self.events}
+        )
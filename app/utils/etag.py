@@ -0,0 +1,35 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response, status
+
+ETAG_HEADER = 'ETag'
+
+
+def make_etag(*parts) -> str:
+    """Строгий ETag из значений, однозначно задающих ответ."""
+
+    digest = hashlib.blake2b(
+        repr(parts).encode(), digest_size=16
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение с If-None-Match (RFC 9110, 13.1.2)."""
+
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(
+        candidate.strip().removeprefix('W/') == etag
+        for candidate in if_none_match.split(',')
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={ETAG_HEADER: etag},
+    )
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Iterable, Mapping
+
+from app.schemas.task_manager import GetTaskSchema
+
+EXPORT_FIELDS = tuple(GetTaskSchema.model_fields)
+
+
+class ExportFormat(str, Enum):
+
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+
+
+def _plain(value):
+    """Приводит значение колонки к json/csv-совместимому виду."""
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _serialize_ndjson(rows: Iterable[Mapping]) -> bytes:
+    return b''.join(
+        json.dumps(
+            {field: _plain(row[field]) for field in EXPORT_FIELDS},
+            ensure_ascii=False,
+        ).encode()
+        + b'\n'
+        for row in rows
+    )
+
+
+def _serialize_csv(rows: Iterable[Mapping]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [_plain(row[field]) for field in EXPORT_FIELDS] for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+async def encode_rows(
+    partitions: AsyncIterator[Iterable[Mapping]],
+    export_format: ExportFormat,
+) -> AsyncIterator[bytes]:
+    """Сериализует пачки строк БД в NDJSON или CSV по одной пачке."""
+
+    if export_format == ExportFormat.CSV:
+        yield (','.join(EXPORT_FIELDS) + '\r\n').encode()
+        serialize = _serialize_csv
+    else:
+        serialize = _serialize_ndjson
+
+    async for rows in partitions:
+        yield serialize(rows)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Сжимает поток чанков в gzip без буферизации всего ответа."""
+
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,39 @@
+from typing import Iterable, List, Mapping
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+#  Сериализует строки по типам значений, без валидации схемой.
+ROWS_ADAPTER = TypeAdapter(List[dict])
+
+
+class RawJSONResponse(Response):
+    """Ответ с телом, уже сериализованным в JSON."""
+
+    media_type = 'application/json'
+
+
+def dump_rows(rows: Iterable[Mapping]) -> bytes:
+    """Сериализует строки БД в JSON-массив без создания ORM-объектов.
+
+    Использует orjson, если он установлен, иначе pydantic TypeAdapter.
+    """
+
+    rows = list(rows)
+    if orjson is not None:
+        return orjson.dumps(rows)
+    return ROWS_ADAPTER.dump_json(rows)
+
+
+def dump_json(value) -> bytes:
+    """Сериализует значение в JSON через orjson либо pydantic-core."""
+
+    if orjson is not None:
+        return orjson.dumps(value)
+    return to_json(value)
@@ -0,0 +1,113 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi import status as http_status
+from pydantic import ValidationError
+
+from app.core.constants import MAX_IMPORT_RECORD_LENGTH
+from app.schemas.task_manager import CreateTaskSchema
+from app.utils.export import ExportFormat
+
+IMPORT_FIELDS = ('name', 'description')
+
+#  (номер записи, (name, description) либо None, описание ошибки либо None)
+ImportRecord = Tuple[int, Optional[Tuple[str, str]], Optional[str]]
+
+
+def _reject(detail: str):
+    raise HTTPException(
+        status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail
+    )
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Нарезает поток байтов на строки, не читая его целиком."""
+
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line + '\n'
+        if len(pending) > MAX_IMPORT_RECORD_LENGTH:
+            _reject('Слишком длинная строка в файле импорта.')
+
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+async def _iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[list]:
+    """Собирает CSV-записи, в том числе с переводами строк в кавычках."""
+
+    record = ''
+    async for line in _iter_lines(chunks):
+        record += line
+        #  Нечетное число кавычек - поле в кавычках еще не закрыто.
+        if record.count('"') % 2:
+            if len(record) > MAX_IMPORT_RECORD_LENGTH:
+                _reject('Слишком длинная запись в файле импорта.')
+            continue
+        if record.strip():
+            yield next(csv.reader([record]))
+        record = ''
+
+    if record.strip():
+        yield next(csv.reader([record]))
+
+
+def _validate(data: dict) -> Tuple[Optional[Tuple[str, str]], Optional[str]]:
+    try:
+        task = CreateTaskSchema.model_validate(
+            {field: data.get(field) for field in IMPORT_FIELDS}
+        )
+    except ValidationError as e:
+        errors = '; '.join(
+            f'{".".join(map(str, error["loc"]))}: {error["msg"]}'
+            for error in e.errors()
+        )
+        return None, errors
+    return (task.name, task.description), None
+
+
+async def iter_import_records(
+    chunks: AsyncIterator[bytes],
+    import_format: ExportFormat,
+) -> AsyncIterator[ImportRecord]:
+    """Потоково разбирает и валидирует записи файла импорта."""
+
+    if import_format == ExportFormat.CSV:
+        rows = _iter_csv_rows(chunks)
+        header = await anext(rows, None)
+        if header is None or not set(IMPORT_FIELDS) <= set(header):
+            _reject(
+                f'CSV должен содержать колонки: {", ".join(IMPORT_FIELDS)}'
+            )
+
+        number = 0
+        async for row in rows:
+            number += 1
+            if len(row) != len(header):
+                yield number, None, 'Неверное число колонок.'
+                continue
+            yield (number, *_validate(dict(zip(header, row))))
+        return
+
+    number = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield number, None, 'Некорректный JSON.'
+            continue
+        if not isinstance(data, dict):
+            yield number, None, 'Ожидается JSON-объект.'
+            continue
+        yield (number, *_validate(data))
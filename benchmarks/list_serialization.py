@@ -0,0 +1,88 @@
+"""Сериализация страницы списка задач: ORM-путь против строк колонок.
+
+Сравниваются:
+    orm      - Task из строк и serialize_response FastAPI через
+               GetTaskSchema (from_attributes), затем JSONResponse;
+    orjson   - dump_rows по строкам колонок через orjson;
+    adapter  - dump_rows по строкам колонок через pydantic TypeAdapter.
+
+Чтение из БД одинаково для всех путей и не измеряется. БД не требуется.
+
+Запуск:
+    python -m benchmarks.list_serialization --rows 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+import app.utils.serialization as serialization
+from app.core.constants import TaskStatus
+from app.models.task_manager import Task
+from app.schemas.task_manager import GetTaskSchema
+
+
+def make_rows(count: int) -> List[dict]:
+    started = datetime.now()
+    statuses = list(TaskStatus)
+    return [
+        {
+            'id': uuid.uuid4(),
+            'created_at': started + timedelta(microseconds=number),
+            'updated_at': started + timedelta(microseconds=number),
+            'name': f'Задача {number}',
+            'description': 'д' * 100,
+            'status': statuses[number % len(statuses)],
+        }
+        for number in range(count)
+    ]
+
+
+async def orm_path(rows: List[dict], field) -> bytes:
+    tasks = [Task(**row) for row in rows]
+    content = await serialize_response(
+        field=field, response_content=tasks, is_coroutine=True
+    )
+    return JSONResponse(content).body
+
+
+async def rows_path(rows: List[dict], field) -> bytes:
+    return serialization.RawJSONResponse(serialization.dump_rows(rows)).body
+
+
+async def measure(path, rows: List[dict], repeat: int, field) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await path(rows, field)
+    return len(rows) * repeat / (time.perf_counter() - started)
+
+
+async def main(rows_count: int, repeat: int):
+    rows = make_rows(rows_count)
+    field = create_model_field('response', List[GetTaskSchema])
+    orjson = serialization.orjson
+
+    results = {'orm': await measure(orm_path, rows, repeat, field)}
+    if orjson is not None:
+        results['orjson'] = await measure(rows_path, rows, repeat, field)
+    serialization.orjson = None
+    results['adapter'] = await measure(rows_path, rows, repeat, field)
+    serialization.orjson = orjson
+
+    print(f'{"путь":<10}{"строк/сек":>14}{"ускорение":>12}')
+    for name, rate in results.items():
+        print(f'{name:<10}{rate:>14.0f}{rate / results["orm"]:>11.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
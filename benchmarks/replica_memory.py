@@ -0,0 +1,61 @@
+"""Объем памяти реплики задач в пересчете на 100 тысяч задач.
+
+Реплика заполняется синтетическими задачами с именем и описанием
+заданной длины, затем выводятся прирост памяти по tracemalloc и оценка
+TaskReplica.memory_usage. БД не требуется.
+
+Запуск:
+    python -m benchmarks.replica_memory --tasks 100000 --description 100
+"""
+import argparse
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.constants import TaskStatus
+from app.core.replica import TaskReplica
+
+PER_TASKS = 100_000
+
+
+def fill(replica: TaskReplica, tasks: int, description: int) -> None:
+    started = datetime.now()
+    statuses = list(TaskStatus)
+    for number in range(tasks):
+        created_at = started + timedelta(microseconds=number)
+        replica.upsert(
+            {
+                'id': str(uuid.uuid4()),
+                'name': f'Задача {number}',
+                'description': 'д' * description,
+                'status': statuses[number % len(statuses)],
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+        )
+    replica.loaded = True
+
+
+def main(tasks: int, description: int):
+    replica = TaskReplica()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    fill(replica, tasks, description)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    scale = PER_TASKS / tasks
+    traced = (after - before) * scale / 2**20
+    estimated = replica.memory_usage() * scale / 2**20
+    print(f'задач: {len(replica)}, описание: {description} символов')
+    print(f'tracemalloc на 100 тыс. задач, МБ: {traced:.1f}')
+    print(f'memory_usage на 100 тыс. задач, МБ: {estimated:.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=PER_TASKS)
+    parser.add_argument('--description', type=int, default=100)
+    args = parser.parse_args()
+    main(args.tasks, args.description)
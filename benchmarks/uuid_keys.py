@@ -0,0 +1,76 @@
+"""Сравнение uuid4 и uuid7 в качестве первичного ключа на postgres.
+
+Для каждого генератора создается таблица с uuid-ключом, в нее пачками
+вставляется заданное число строк, затем выводятся скорость вставки и
+размер индекса первичного ключа.
+
+Запуск (debug_mode=docker либо False):
+    python -m benchmarks.uuid_keys --rows 1000000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.ids import ID_GENERATORS
+
+
+async def bench_generator(connection, name: str, rows: int, batch: int):
+    table = f'bench_{name}'
+    generate = ID_GENERATORS[name]
+
+    await connection.execute(f'DROP TABLE IF EXISTS {table}')
+    await connection.execute(
+        f'CREATE TABLE {table} (id uuid PRIMARY KEY, payload text NOT NULL)'
+    )
+
+    started = time.perf_counter()
+    for offset in range(0, rows, batch):
+        await connection.executemany(
+            f'INSERT INTO {table} (id, payload) VALUES ($1, $2)',
+            [
+                (generate(), f'task {number}')
+                for number in range(offset, min(offset + batch, rows))
+            ],
+        )
+    elapsed = time.perf_counter() - started
+
+    index_size = await connection.fetchval(
+        f"SELECT pg_relation_size('{table}_pkey')"
+    )
+    await connection.execute(f'DROP TABLE {table}')
+    return elapsed, index_size
+
+
+async def main(rows: int, batch: int):
+    if settings.debug_mode == 'local':
+        raise SystemExit('Бенчмарк рассчитан на postgres.')
+
+    engine = create_async_engine(settings.database_url)
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        print(
+            f'{"генератор":<10}{"сек":>10}'
+            f'{"строк/сек":>14}{"индекс, МБ":>14}'
+        )
+        for name in ID_GENERATORS:
+            elapsed, index_size = await bench_generator(
+                driver_connection, name, rows, batch
+            )
+            print(
+                f'{name:<10}{elapsed:>10.1f}{rows / elapsed:>14.0f}'
+                f'{index_size / 2 ** 20:>14.1f}'
+            )
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.batch))
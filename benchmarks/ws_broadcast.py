@@ -0,0 +1,60 @@
+"""Стоимость кодирования события websocket при рассылке N клиентам.
+
+Сравниваются кодирование json.dumps для каждого клиента (как делал
+send_json) и однократное кодирование encode_message для всех. Отправка
+в сокеты не измеряется. БД не требуется.
+
+Запуск:
+    python -m benchmarks.ws_broadcast --clients 10000 --events 20
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+
+from app.api.endpoints.websocket import encode_message
+from app.core.constants import TaskStatus
+
+
+def make_event() -> dict:
+    return {
+        'event': 'task_updated',
+        'data': {
+            'id': str(uuid.uuid4()),
+            'name': 'Задача',
+            'status': TaskStatus.IN_PROGRESS,
+            'description': 'д' * 200,
+            'updated_at': datetime.now().isoformat(),
+        },
+    }
+
+
+def per_client(message: dict, clients: int) -> None:
+    for _ in range(clients):
+        json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+
+
+def once(message: dict, clients: int) -> None:
+    frame = encode_message(message)
+    for _ in range(clients):
+        assert frame
+
+
+def main(clients: int, events: int):
+    message = make_event()
+    print(f'{"способ":<12}{"мс на событие":>16}')
+    for name, encode in (('per_client', per_client), ('once', once)):
+        started = time.perf_counter()
+        for _ in range(events):
+            encode(message, clients)
+        elapsed = (time.perf_counter() - started) / events * 1000
+        print(f'{name:<12}{elapsed:>16.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--events', type=int, default=20)
+    args = parser.parse_args()
+    main(args.clients, args.events)
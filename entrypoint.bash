@@ -7,12 +7,14 @@ while ! nc -z db 5432; do
 done
 echo "Postgres started"
 
-echo "Generating migrations"
-alembic revision --autogenerate
-
 echo "Applying db migrations"
 alembic upgrade head
 echo "Migrations successfully applied"
 
 echo "Starting uvicorn server..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8001
\ No newline at end of file
+# Адрес клиента для лимитов websocket берется из X-Forwarded-For,
+# которому верим только от nginx. Живость websocket проверяется ping
+# на уровне протокола, браузеры отвечают на него сами.
+exec uvicorn app.main:app --host 0.0.0.0 --port 8001 \
+  --proxy-headers --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-127.0.0.1}" \
+  --ws-ping-interval 20 --ws-ping-timeout 20
\ No newline at end of file
@@ -1,9 +1,17 @@
+import base64
+import csv
+import io
+import json
+import uuid
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.crud.task_manager import TaskCRUD
+from app.schemas.pagination import NEXT_CURSOR_HEADER
 
 
 @pytest.mark.asyncio
@@ -46,7 +54,7 @@ async def test_get_tasks_list_also_filtered(
     task = await create_task(name='Тестовая задача2')
 
     in_work_task = await task_crud.update(
-        task, {'status': 'В работе'}, session
+        task.id, {'status': 'В работе'}, session
     )
 
     result = await client.get(task_url)
@@ -67,6 +75,203 @@ async def test_get_tasks_list_also_filtered(
     assert data['status'] == 'В работе'
 
 
+@pytest.mark.asyncio
+async def test_get_tasks_list_paginated(
+    client: AsyncClient,
+    task_url: str,
+    create_task,
+):
+    tasks = [await create_task() for _ in range(3)]
+
+    result = await client.get(task_url, params={'limit': 2})
+    assert result.status_code == status.HTTP_200_OK
+    first_page = result.json()
+    assert len(first_page) == 2
+
+    cursor = result.headers[NEXT_CURSOR_HEADER]
+    result = await client.get(task_url, params={'limit': 2, 'cursor': cursor})
+    assert result.status_code == status.HTTP_200_OK
+    second_page = result.json()
+    assert len(second_page) == 1
+    assert NEXT_CURSOR_HEADER not in result.headers
+
+    assert {data['id'] for data in first_page + second_page} == {
+        str(task.id) for task in tasks
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'not-a-cursor',
+        base64.urlsafe_b64encode(b'["2020-01-01", 123]').decode(),
+        base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    ],
+)
+async def test_get_tasks_list_invalid_cursor(
+    client: AsyncClient, task_url: str, cursor: str
+):
+    result = await client.get(task_url, params={'cursor': cursor})
+    assert result.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('use_orjson', [True, False])
+async def test_get_tasks_list_raw_rows(
+    client: AsyncClient, task_url: str, create_task, monkeypatch, use_orjson
+):
+    if not use_orjson:
+        monkeypatch.setattr('app.utils.serialization.orjson', None)
+    tasks = [await create_task() for _ in range(3)]
+
+    result = await client.get(task_url)
+
+    assert result.headers['content-type'] == 'application/json'
+    for task, data in zip(tasks, result.json()):
+        single = await client.get(f'{task_url}{task.id}')
+        assert data == single.json()
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_sparse_fields(
+    client: AsyncClient, task_url: str, create_task
+):
+    tasks = [await create_task() for _ in range(3)]
+
+    result = await client.get(
+        task_url, params={'fields': 'status, name,id', 'limit': 2}
+    )
+    assert result.status_code == status.HTTP_200_OK
+    assert [list(item) for item in result.json()] == [
+        ['id', 'name', 'status']
+    ] * 2
+
+    result = await client.get(
+        task_url,
+        params={
+            'fields': 'name',
+            'cursor': result.headers[NEXT_CURSOR_HEADER],
+        },
+    )
+    assert result.json() == [{'name': tasks[2].name}]
+
+    result = await client.get(
+        f'{task_url}{tasks[0].id}', params={'fields': 'description'}
+    )
+    assert result.json() == {'description': tasks[0].description}
+    assert 'ETag' in result.headers
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fields', ['secret', '', 'name,secret'])
+async def test_get_tasks_invalid_fields(
+    client: AsyncClient, task_url: str, fields: str
+):
+    result = await client.get(task_url, params={'fields': fields})
+    assert result.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_get_task_not_modified(
+    client: AsyncClient, task_url: str, create_task
+):
+    task = await create_task()
+
+    result = await client.get(f'{task_url}{task.id}')
+    etag = result.headers['ETag']
+
+    result = await client.get(
+        f'{task_url}{task.id}', headers={'If-None-Match': f'W/{etag}'}
+    )
+    assert result.status_code == status.HTTP_304_NOT_MODIFIED
+    assert result.headers['ETag'] == etag
+    assert not result.content
+
+    await client.patch(f'{task_url}{task.id}', json={'status': 'В работе'})
+    result = await client.get(
+        f'{task_url}{task.id}', headers={'If-None-Match': etag}
+    )
+    assert result.status_code == status.HTTP_200_OK
+    assert result.headers['ETag'] != etag
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_list_not_modified(
+    monkeypatch, client: AsyncClient, task_url: str, create_task
+):
+    monkeypatch.setattr(settings, 'event_bus', 'postgres')
+    await client.post(task_url, json={'name': 'Первая', 'description': 'Д'})
+
+    result = await client.get(task_url)
+    etag = result.headers['ETag']
+    filtered = await client.get(task_url, params={'status': 'Создано'})
+    assert filtered.headers['ETag'] != etag
+
+    result = await client.get(task_url, headers={'If-None-Match': etag})
+    assert result.status_code == status.HTTP_304_NOT_MODIFIED
+
+    await client.post(task_url, json={'name': 'Вторая', 'description': 'Д'})
+    result = await client.get(task_url, headers={'If-None-Match': etag})
+    assert result.status_code == status.HTTP_200_OK
+    assert len(result.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_list_no_etag_with_memory_bus(
+    monkeypatch, client: AsyncClient, task_url: str
+):
+    monkeypatch.setattr(settings, 'event_bus', 'memory')
+
+    result = await client.get(task_url)
+
+    assert result.status_code == status.HTTP_200_OK
+    assert 'ETag' not in result.headers
+
+
+@pytest.mark.asyncio
+async def test_export_tasks_ndjson_filtered(
+    client: AsyncClient,
+    task_url: str,
+    create_task,
+    task_crud: TaskCRUD,
+    session: AsyncSession,
+):
+    await create_task()
+    task = await create_task()
+    await task_crud.update(task.id, {'status': 'В работе'}, session)
+
+    result = await client.get(
+        f'{task_url}export', params={'status': 'В работе'}
+    )
+    assert result.status_code == status.HTTP_200_OK
+    assert result.headers['content-type'] == 'application/x-ndjson'
+
+    rows = [json.loads(line) for line in result.text.splitlines()]
+    assert len(rows) == 1
+    assert rows[0]['id'] == str(task.id)
+    assert rows[0]['status'] == 'В работе'
+
+
+@pytest.mark.asyncio
+async def test_export_tasks_csv_gzip(
+    client: AsyncClient,
+    task_url: str,
+    create_task,
+):
+    tasks = [await create_task() for _ in range(3)]
+
+    result = await client.get(
+        f'{task_url}export', params={'format': 'csv', 'gzip': True}
+    )
+    assert result.status_code == status.HTTP_200_OK
+    assert result.headers['content-encoding'] == 'gzip'
+
+    #  httpx прозрачно распаковывает ответ по Content-Encoding.
+    rows = list(csv.DictReader(io.StringIO(result.text)))
+    assert {row['id'] for row in rows} == {str(task.id) for task in tasks}
+
+
 @pytest.mark.asyncio
 async def test_update_task_status_transitions(
     task_url: str, client: AsyncClient, create_task
@@ -79,6 +284,12 @@ async def test_update_task_status_transitions(
     assert result.status_code == status.HTTP_200_OK
     assert result.json()['status'] == 'В работе'
 
+    result = await client.patch(
+        f'{task_url}{task.id}', json={'status': 'завершено'}
+    )
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json()['status'] == 'Завершено'
+
     task_2 = await create_task()
     result = await client.patch(
         f'{task_url}{task_2.id}', json={'status': 'Завершено'}
@@ -88,6 +299,19 @@ async def test_update_task_status_transitions(
     assert 'Недопустимый переход' in result.json()['detail']
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize('value', [5, ['В работе']])
+async def test_update_task_invalid_status_type(
+    task_url: str, client: AsyncClient, create_task, value
+):
+    task = await create_task()
+    result = await client.patch(
+        f'{task_url}{task.id}', json={'status': value}
+    )
+
+    assert result.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 @pytest.mark.asyncio
 async def test_create_task(
     client: AsyncClient, task_url: str, valid_task_data: dict
@@ -118,6 +342,149 @@ async def test_cant_create_with_status(
     )
 
 
+@pytest.mark.asyncio
+async def test_bulk_create_tasks(
+    client: AsyncClient, task_url: str, create_task
+):
+    task = await create_task(name='Занятое имя')
+    tasks_data = [
+        {'name': 'Задача 1', 'description': 'Описание'},
+        {'name': task.name, 'description': 'Описание'},
+        {'name': 'Задача 2', 'description': 'Описание'},
+        {'name': 'Задача 1', 'description': 'Описание'},
+    ]
+
+    result = await client.post(f'{task_url}bulk', json=tasks_data)
+    assert result.status_code == status.HTTP_200_OK
+
+    data = result.json()
+    assert [task['name'] for task in data['created']] == [
+        'Задача 1',
+        'Задача 2',
+    ]
+    assert all(task['status'] == 'Создано' for task in data['created'])
+    assert [error['index'] for error in data['errors']] == [1, 3]
+
+    result = await client.get(task_url)
+    assert len(result.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_tasks_empty(client: AsyncClient, task_url: str):
+    result = await client.post(f'{task_url}bulk', json=[])
+    assert result.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_import_tasks_csv(
+    client: AsyncClient, task_url: str, create_task
+):
+    task = await create_task(name='Занятое имя')
+    content = (
+        'name,description\r\n'
+        'Задача 1,"Описание\nв две строки"\r\n'
+        f'{task.name},Описание\r\n'
+        ',Без имени\r\n'
+        'Задача 1,Повтор\r\n'
+        'Задача 2,Описание\r\n'
+    )
+
+    result = await client.post(
+        f'{task_url}import',
+        params={'format': 'csv'},
+        content=content.encode(),
+        headers={'Content-Type': 'text/csv'},
+    )
+    assert result.status_code == status.HTTP_200_OK
+
+    data = result.json()
+    assert data['received'] == 5
+    assert data['imported'] == 2
+    assert data['rejected_count'] == 3
+    assert [row['row'] for row in data['rejected']] == [2, 3, 4]
+
+    result = await client.get(task_url, params={'name': 'Задача 1'})
+    assert result.json()[0]['description'] == 'Описание\nв две строки'
+
+
+@pytest.mark.asyncio
+async def test_import_tasks_ndjson(client: AsyncClient, task_url: str):
+    lines = [
+        json.dumps({'name': f'Задача {i}', 'description': 'Описание'})
+        for i in range(10)
+    ]
+    lines.insert(3, '{broken')
+
+    result = await client.post(
+        f'{task_url}import',
+        content='\n'.join(lines).encode(),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+    assert result.status_code == status.HTTP_200_OK
+
+    data = result.json()
+    assert data['imported'] == 10
+    assert data['rejected'] == [
+        {'row': 4, 'name': None, 'detail': 'Некорректный JSON.'}
+    ]
+
+    result = await client.get(task_url)
+    assert len(result.json()) == 10
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_status(
+    client: AsyncClient,
+    task_url: str,
+    create_task,
+    task_crud: TaskCRUD,
+    session: AsyncSession,
+):
+    created_task = await create_task()
+    in_work_tasks = [await create_task() for _ in range(2)]
+    for task in in_work_tasks:
+        await task_crud.update(task.id, {'status': 'В работе'}, session)
+
+    result = await client.patch(
+        f'{task_url}bulk/status', json={'status': 'Завершено'}
+    )
+    assert result.status_code == status.HTTP_400_BAD_REQUEST
+
+    result = await client.patch(
+        f'{task_url}bulk/status',
+        params={'status': 'В работе'},
+        json={'status': 'Завершено'},
+    )
+    assert result.status_code == status.HTTP_200_OK
+    assert set(result.json()['ids']) == {
+        str(task.id) for task in in_work_tasks
+    }
+
+    #  Из статуса 'Создано' в 'Завершено' перейти нельзя.
+    result = await client.patch(
+        f'{task_url}bulk/status',
+        json={'status': 'Завершено', 'ids': [str(created_task.id)]},
+    )
+    assert result.json() == {'ids': [], 'count': 0}
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_tasks(
+    client: AsyncClient, task_url: str, create_task
+):
+    tasks = [await create_task() for _ in range(3)]
+
+    result = await client.post(
+        f'{task_url}bulk/delete',
+        json={'ids': [str(task.id) for task in tasks[:2]]},
+    )
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json()['count'] == 2
+
+    result = await client.get(task_url)
+    assert [task['id'] for task in result.json()] == [str(tasks[2].id)]
+
+
 @pytest.mark.asyncio
 async def test_update_task(
     client: AsyncClient,
@@ -149,3 +516,16 @@ async def test_delete_task(task_url: str, client: AsyncClient, create_task):
 
     result = await client.get(f'{task_url}{task.id}')
     assert result.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_update_delete_missing_task(task_url: str, client: AsyncClient):
+    missing_id = uuid.uuid4()
+
+    result = await client.patch(
+        f'{task_url}{missing_id}', json={'status': 'В работе'}
+    )
+    assert result.status_code == status.HTTP_404_NOT_FOUND
+
+    result = await client.delete(f'{task_url}{missing_id}')
+    assert result.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,94 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core.cache import MISSING, NOT_CACHED, LRUTTLCache, task_cache
+from app.crud.task_manager import Task, TaskCRUD
+
+
+def test_lru_eviction():
+    cache = LRUTTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is NOT_CACHED
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr('app.core.cache.time.monotonic', lambda: now)
+    cache = LRUTTLCache(maxsize=10, ttl=5, negative_ttl=1)
+    cache.set('a', 1)
+    cache.set_missing('b')
+
+    now += 2
+    assert cache.get('a') == 1
+    assert cache.get('b') is NOT_CACHED
+
+    now += 5
+    assert cache.get('a') is NOT_CACHED
+    assert cache.stats()['hits'] == 1
+
+
+def test_negative_cache_disabled():
+    cache = LRUTTLCache(maxsize=10, ttl=5, negative_ttl=0)
+    cache.set_missing('a')
+    assert cache.get('a') is NOT_CACHED
+
+
+@pytest.mark.asyncio
+async def test_get_task_cached_and_invalidated(
+    client: AsyncClient, task_url: str, create_task
+):
+    task_cache.clear()
+    task = await create_task()
+
+    await client.get(f'{task_url}{task.id}')
+    hits = task_cache.hits
+    result = await client.get(f'{task_url}{task.id}')
+    assert result.status_code == status.HTTP_200_OK
+    assert task_cache.hits == hits + 1
+
+    await client.patch(f'{task_url}{task.id}', json={'name': 'Новое имя'})
+    assert task_cache.get(str(task.id)) is NOT_CACHED
+
+    result = await client.get(f'{task_url}{task.id}')
+    assert result.json()['name'] == 'Новое имя'
+
+    await client.delete(f'{task_url}{task.id}')
+    assert task_cache.get(str(task.id)) is MISSING
+
+    result = await client.get('http://127.0.0.1:8000/api/metrics/')
+    assert set(result.json()['task_cache']) >= {'hits', 'misses', 'evictions'}
+
+
+@pytest.mark.asyncio
+async def test_read_overlapping_update_not_cached(
+    mocker, session, create_task
+):
+    cache = LRUTTLCache(maxsize=10, ttl=60, negative_ttl=60)
+    crud = TaskCRUD(Task, manager=mocker.AsyncMock(), cache=cache)
+    task = await create_task()
+    old_name = task.name
+    fetch_rows = crud._fetch_rows
+
+    async def fetch_then_update(session, query):
+        rows = await fetch_rows(session, query)
+        #  Изменение завершилось, пока чтение возвращало старую строку.
+        await crud.update(task.id, {'name': 'Новое имя'}, session)
+        return rows
+
+    mocker.patch.object(crud, '_fetch_rows', fetch_then_update)
+    stale = await crud.get_or_404(session, task.id)
+    assert stale.name == old_name
+    assert cache.get(str(task.id)) is NOT_CACHED
+
+    mocker.patch.object(crud, '_fetch_rows', fetch_rows)
+    result = await crud.get_or_404(session, task.id)
+    assert result.name == 'Новое имя'
+    assert cache.get(str(task.id))['name'] == 'Новое имя'
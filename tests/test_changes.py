@@ -0,0 +1,191 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.events import stream_events
+from app.api.endpoints.websocket import ConnectionManager, ws
+from app.core.event_bus import RESYNC_EVENT
+from app.crud.task_changes import TaskChangeCRUD
+from app.crud.task_manager import Task, TaskCRUD
+
+from .test_events import FakeRequest
+from .test_websocket import FakeWebSocket
+
+
+@pytest.fixture
+def changes_crud(mocker):
+    return TaskCRUD(
+        Task, manager=mocker.AsyncMock(), changes=TaskChangeCRUD()
+    )
+
+
+@pytest.mark.asyncio
+async def test_changes_recorded_with_sequence(
+    session: AsyncSession,
+    changes_crud: TaskCRUD,
+    valid_task_data: dict,
+):
+    task = await changes_crud.create(data=valid_task_data, session=session)
+    await changes_crud.update(task.id, {'name': 'Новое имя'}, session)
+    await changes_crud.delete(task.id, session)
+
+    changes = await changes_crud.changes.get_since(session, 0)
+
+    assert [change['event'] for change in changes] == [
+        'task_created',
+        'task_updated',
+        'task_deleted',
+    ]
+    seqs = [change['seq'] for change in changes]
+    assert seqs == sorted(seqs) and len(set(seqs)) == 3
+    assert changes[1]['data']['name'] == 'Новое имя'
+    assert changes[1]['data']['truncated']
+    assert 'description' not in changes[1]['data']
+
+    broadcast = changes_crud.connection_manager.broadcast
+    assert broadcast.call_args.args[0]['seq'] == seqs[-1]
+    assert await changes_crud.changes.get_since(session, seqs[1]) == [
+        changes[2]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_changes_since(
+    client: AsyncClient,
+    task_url: str,
+    valid_task_data: dict,
+    valid_task_data2: dict,
+):
+    await client.post(task_url, json=valid_task_data)
+    await client.post(task_url, json=valid_task_data2)
+
+    first = await client.get(f'{task_url}changes', params={'limit': 1})
+    assert first.status_code == status.HTTP_200_OK
+    page = first.json()
+    assert [c['data']['name'] for c in page['changes']] == [
+        valid_task_data['name']
+    ]
+
+    rest = await client.get(
+        f'{task_url}changes', params={'since': page['last_seq']}
+    )
+    assert [c['data']['name'] for c in rest.json()['changes']] == [
+        valid_task_data2['name']
+    ]
+
+    latest = rest.json()['last_seq']
+    empty = await client.get(f'{task_url}changes', params={'since': latest})
+    assert empty.json() == {'changes': [], 'last_seq': latest}
+
+
+@pytest.mark.asyncio
+async def test_pruned_changes_gone(
+    client: AsyncClient,
+    session: AsyncSession,
+    changes_crud: TaskCRUD,
+    task_url: str,
+):
+    for number in range(3):
+        await changes_crud.create(
+            data={'name': f'задача {number}', 'description': 'описание'},
+            session=session,
+        )
+    last_seq = (await changes_crud.changes.get_since(session, 0))[-1]['seq']
+    await TaskChangeCRUD(retention=-1).prune(session, last_seq)
+    await session.commit()
+
+    result = await client.get(f'{task_url}changes', params={'since': 0})
+
+    assert result.status_code == status.HTTP_410_GONE
+    kept = await changes_crud.changes.get_since(session, last_seq - 1)
+    assert [change['seq'] for change in kept] == [last_seq]
+
+
+@pytest.mark.asyncio
+async def test_websocket_resume_replays_missed_changes(
+    session: AsyncSession,
+    changes_crud: TaskCRUD,
+):
+    for number in range(3):
+        await changes_crud.create(
+            data={'name': f'задача {number}', 'description': 'описание'},
+            session=session,
+        )
+    changes = await changes_crud.changes.get_since(session, 0)
+    manager = ConnectionManager(queue_size=10, ping_interval=0)
+    client = FakeWebSocket()
+    manager.add_connection(client)
+
+    live = {'event': 'task_deleted', 'data': {'id': '1'}, 'seq': 100}
+    get_since = changes_crud.changes.get_since
+
+    async def get_since_with_live_event(*args, **kwargs):
+        await manager.broadcast(live)
+        return await get_since(*args, **kwargs)
+
+    changes_crud.changes.get_since = get_since_with_live_event
+    await manager.resume(
+        client, changes[0]['seq'], session, changes_crud.changes
+    )
+    await asyncio.sleep(0)
+
+    assert client.messages == [
+        json.loads(json.dumps(change)) for change in changes[1:]
+    ] + [live]
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_websocket_resume_too_far_behind_gets_resync(
+    session: AsyncSession,
+    changes_crud: TaskCRUD,
+):
+    for number in range(3):
+        await changes_crud.create(
+            data={'name': f'задача {number}', 'description': 'описание'},
+            session=session,
+        )
+    manager = ConnectionManager(queue_size=2, ping_interval=0)
+    client = FakeWebSocket()
+    manager.add_connection(client)
+
+    await manager.resume(client, 0, session, changes_crud.changes)
+    await asyncio.sleep(0)
+
+    assert client.messages == [{'event': RESYNC_EVENT, 'data': {}}]
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_failed_resume_releases_connection(mocker):
+    manager = ConnectionManager(queue_size=10, ping_interval=0)
+    changes = TaskChangeCRUD()
+    mocker.patch.object(
+        changes, 'get_since', side_effect=ConnectionError('БД недоступна')
+    )
+    client = FakeWebSocket()
+
+    with pytest.raises(ConnectionError):
+        await ws(
+            client,
+            since=1,
+            connection_manager=manager,
+            task_changes=changes,
+            session=mocker.AsyncMock(),
+        )
+    with pytest.raises(ConnectionError):
+        await stream_events(
+            FakeRequest(host=client.client.host),
+            since=1,
+            last_event_id=None,
+            connection_manager=manager,
+            task_changes=changes,
+            session=mocker.AsyncMock(),
+        )
+
+    assert manager.stats()['connections'] == 0
+    assert manager.connections_per_ip == {}
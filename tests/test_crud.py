@@ -1,9 +1,13 @@
+from datetime import datetime
+
 import pytest
 from fastapi import HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from app.crud.task_manager import TaskCRUD
+from app.crud.task_manager import Task, TaskCRUD
 from app.schemas.filters import TaskFilter
+from app.schemas.pagination import Pagination, decode_cursor
 from app.schemas.task_manager import CreateTaskSchema, UpdateTaskSchema
 
 
@@ -32,13 +36,98 @@ async def test_create_task_duplicate_name(session, create_task, task_crud):
         )
 
 
+@pytest.mark.asyncio
+async def test_create_task_duplicate_name_ignores_case(
+    session, create_task, task_crud
+):
+    await create_task(name='Test task')
+
+    with pytest.raises(HTTPException):
+        await task_crud.create(
+            {'name': 'TEST TASK', 'description': 'Описание'}, session
+        )
+
+    new_task = await task_crud.create(
+        {'name': 'Other task', 'description': 'Описание'}, session
+    )
+    assert new_task.name == 'Other task'
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_tasks(session, create_task, task_crud):
+    task = await create_task(name='Тестовая задача')
+    task_crud.connection_manager.broadcast.reset_mock()
+
+    created, errors = await task_crud.bulk_create(
+        [
+            {'name': 'Новая задача', 'description': 'Описание'},
+            {'name': task.name, 'description': 'Описание'},
+        ],
+        session,
+    )
+
+    assert [new_task.name for new_task in created] == ['Новая задача']
+    assert [error['index'] for error in errors] == [1]
+    task_crud.connection_manager.broadcast.assert_awaited_once()
+    assert (
+        task_crud.connection_manager.broadcast.await_args.args[0]['event']
+        == 'tasks_created'
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_in_chunks(session, create_task, task_crud):
+    task = await create_task(name='Тестовая задача')
+
+    async def records():
+        for number in range(1, 6):
+            yield number, (f'Задача {number}', 'Описание'), None
+        yield 6, (task.name, 'Описание'), None
+
+    result = await task_crud.bulk_import(session, records(), chunk_size=2)
+
+    assert result['received'] == 6
+    assert result['imported'] == 5
+    assert [row['row'] for row in result['rejected']] == [6]
+    assert len(await task_crud.get_list(session)) == 6
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_rejected_report_capped(
+    mocker, session, task_crud
+):
+    mocker.patch('app.crud.task_manager.MAX_IMPORT_REJECTED_REPORT', 3)
+
+    async def records():
+        for number in range(1, 11):
+            yield number, None, 'Пустое имя.'
+
+    result = await task_crud.bulk_import(session, records())
+
+    assert result['rejected_count'] == 10
+    assert [row['row'] for row in result['rejected']] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'new_data', [{'name': 'Новое имя'}, {'status': 'В работе'}]
+)
+async def test_update_missing_task_not_found(session, task_crud, new_data):
+    with pytest.raises(HTTPException) as error:
+        await task_crud.update(
+            '00000000-0000-0000-0000-000000000000', new_data, session
+        )
+
+    assert error.value.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_update_task_duplicate_name(session, create_task, task_crud):
     task = await create_task(name='Тестовая задача')
     task_2 = await create_task(name='Тестовая задача_2')
 
     with pytest.raises(HTTPException):
-        await task_crud.update(task, {'name': task_2.name}, session)
+        await task_crud.update(task.id, {'name': task_2.name}, session)
 
 
 @pytest.mark.asyncio
@@ -90,6 +179,45 @@ async def test_get_tasks_filtered_list(
     assert second_tasks_list[0].name == task_2.name
 
 
+@pytest.mark.asyncio
+async def test_get_tasks_page_filtered(
+    session: AsyncSession,
+    task_crud: TaskCRUD,
+    create_task,
+):
+    tasks = [await create_task() for _ in range(3)]
+    for task in tasks[1:]:
+        await task_crud.update(task.id, {'status': 'В работе'}, session)
+    status_filter = TaskFilter(status='В работе')
+
+    page, next_cursor = await task_crud.get_page(
+        session, status_filter, Pagination(limit=1)
+    )
+    assert len(page) == 1
+    assert next_cursor is not None
+
+    page_2, next_cursor = await task_crud.get_page(
+        session,
+        status_filter,
+        Pagination(limit=1, cursor=decode_cursor(next_cursor)),
+    )
+    assert len(page_2) == 1
+    assert next_cursor is None
+    assert {page[0].id, page_2[0].id} == {tasks[1].id, tasks[2].id}
+
+
+def test_cursor_bound_with_column_types(task_crud: TaskCRUD):
+    criterion = task_crud.after_cursor(
+        datetime(2020, 1, 1), '00000000-0000-0000-0000-000000000000'
+    )
+
+    #  На postgres без типа колонки id сравнивался бы с VARCHAR.
+    assert [value.type for value in criterion.right.clauses] == [
+        Task.created_at.type,
+        Task.id.type,
+    ]
+
+
 @pytest.mark.asyncio
 async def test_update_task(
     session: AsyncSession,
@@ -102,7 +230,7 @@ async def test_update_task(
 
     new_task_data = UpdateTaskSchema(**new_valid_task_data)
     updated_task = await task_crud.update(
-        task,
+        task.id,
         new_task_data.model_dump(exclude_unset=True, exclude_none=True),
         session,
     )
@@ -119,8 +247,37 @@ async def test_delete_task(
     create_task,
 ):
     task = await create_task()
-    await task_crud.delete(task, session)
+    await task_crud.delete(task.id, session)
 
     with pytest.raises(HTTPException) as exc:
         await task_crud.get_or_404(session, task.id)
     assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_page_rows_selects_only_fields(
+    session: AsyncSession,
+    task_crud: TaskCRUD,
+    create_task,
+    engine: AsyncEngine,
+):
+    task = await create_task()
+    queries = []
+
+    def capture(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        rows, _ = await task_crud.get_page_rows(
+            session, fields=('id', 'name', 'created_at')
+        )
+        row = await task_crud.get_row_or_404(
+            session, task.id, fields=('id', 'status')
+        )
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+
+    assert rows[0]['name'] == task.name
+    assert row == {'id': task.id, 'status': task.status}
+    assert all('description' not in query for query in queries)
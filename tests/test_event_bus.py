@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from app.api.endpoints.websocket import ConnectionManager
+from app.core.cache import MISSING, NOT_CACHED, Generation, LRUTTLCache
+from app.core.event_bus import InProcessEventBus, split_payload
+from app.core.singleflight import SingleFlight
+from app.crud.task_manager import invalidate_caches
+
+
+class RecordingBus(InProcessEventBus):
+
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    async def publish(self, message: dict) -> None:
+        self.published.append(message)
+        await super().publish(message)
+
+
+@pytest.mark.asyncio
+async def test_handler_error_does_not_stop_dispatch():
+    bus, received = InProcessEventBus(), []
+
+    def broken(message):
+        raise RuntimeError('ошибка обработчика')
+
+    bus.subscribe(broken)
+    bus.subscribe(received.append)
+    await bus.publish({'event': 'task_updated', 'data': {'id': '1'}})
+
+    assert received == [{'event': 'task_updated', 'data': {'id': '1'}}]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_goes_through_bus():
+    bus = RecordingBus()
+    manager = ConnectionManager(queue_size=10, bus=bus)
+    frames = []
+
+    class Client:
+        async def send_text(self, data):
+            frames.append(data)
+
+    manager.add_connection(Client())
+    await manager.broadcast({'event': 'task_deleted', 'data': {'id': '1'}})
+    await asyncio.sleep(0)
+
+    assert bus.published == [{'event': 'task_deleted', 'data': {'id': '1'}}]
+    assert json.loads(frames[0])['event'] == 'task_deleted'
+    manager.close_all()
+
+
+def test_split_payload_keeps_small_event_whole():
+    message = {'event': 'tasks_deleted', 'data': {'ids': ['1', '2']}}
+
+    payloads = split_payload(message)
+
+    assert [json.loads(payload) for payload in payloads] == [message]
+
+
+def test_split_payload_splits_ids():
+    ids = [f'{number:036d}' for number in range(1000)]
+    message = {
+        'event': 'tasks_updated',
+        'data': {'ids': ids, 'status': 'В работе'},
+    }
+
+    payloads = split_payload(message, limit=4000)
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= 4000 for payload in payloads)
+    parts = [json.loads(payload)['data'] for payload in payloads]
+    assert [pk for part in parts for pk in part['ids']] == ids
+    assert {part['status'] for part in parts} == {'В работе'}
+
+
+def test_split_payload_truncates_large_task():
+    task = {'id': '1', 'description': 'д' * 5000, 'updated_at': 'сейчас'}
+
+    updated, = split_payload({'event': 'task_updated', 'data': task}, 4000)
+    created, = split_payload({'event': 'tasks_created', 'data': [task]}, 4000)
+
+    truncated = {'id': '1', 'updated_at': 'сейчас', 'truncated': True}
+    assert json.loads(updated)['data'] == truncated
+    assert json.loads(created)['data'] == [truncated]
+
+
+@pytest.mark.asyncio
+async def test_event_from_other_process_invalidates_caches():
+    cache = LRUTTLCache(maxsize=10, ttl=60, negative_ttl=60)
+    flights, generation = SingleFlight(), Generation()
+    cache.set('1', {'id': '1'})
+    cache.set('2', {'id': '2'})
+    version = str(generation)
+
+    bus = InProcessEventBus()
+    bus.subscribe(
+        lambda message: invalidate_caches(
+            message['event'], message['data'], cache, flights, generation
+        )
+    )
+    await bus.publish({'event': 'task_deleted', 'data': {'id': '1'}})
+
+    assert cache.get('1') is MISSING
+    assert cache.get('2') == {'id': '2'}
+    assert str(generation) != version
+
+    await bus.publish({'event': 'resync', 'data': {}})
+    assert cache.get('2') is NOT_CACHED
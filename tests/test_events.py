@@ -0,0 +1,157 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.events import PING_COMMENT, stream_events
+from app.api.endpoints.websocket import PING_EVENT, ConnectionManager
+from app.crud.task_changes import TaskChangeCRUD
+from app.crud.task_manager import Task, TaskCRUD
+
+from .test_websocket import FakeWebSocket
+
+
+class FakeRequest:
+
+    def __init__(self, host: str = '10.0.0.2'):
+        self.client = SimpleNamespace(host=host, port=50001)
+
+
+def subscribe(
+    manager, since=None, last_event_id=None, changes=None, session=None
+):
+    return stream_events(
+        FakeRequest(),
+        since=since,
+        last_event_id=last_event_id,
+        connection_manager=manager,
+        task_changes=changes or TaskChangeCRUD(),
+        session=session or AsyncMock(),
+    )
+
+
+async def read_frames(response, count: int) -> list:
+    frames = []
+    async for frame in response.body_iterator:
+        frames.append(frame)
+        if len(frames) == count:
+            break
+    return frames
+
+
+def parse(frame: str) -> dict:
+    fields = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+@pytest.mark.asyncio
+async def test_stream_shares_hub_with_websocket():
+    manager = ConnectionManager(queue_size=10, ping_interval=0)
+    client = FakeWebSocket()
+    manager.add_connection(client)
+    response = await subscribe(manager)
+
+    assert response.media_type == 'text/event-stream'
+    assert response.headers['cache-control'] == 'no-cache'
+    message = {'event': 'task_created', 'data': {'id': '1'}, 'seq': 7}
+    await manager.broadcast(message)
+    await manager.broadcast({'event': 'task_deleted', 'data': {'id': '1'}})
+    frames = await read_frames(response, 2)
+    await asyncio.sleep(0)
+
+    assert parse(frames[0]) == {'id': '7', 'data': message}
+    assert frames[1].startswith('data: ')
+    assert client.messages[0] == message
+    await response.body_iterator.aclose()
+    assert manager.stats()['connections'] == 1
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_stream_ping_is_comment():
+    manager = ConnectionManager(queue_size=10, ping_interval=0)
+    response = await subscribe(manager)
+
+    manager._send({'event': PING_EVENT, 'data': {}})
+
+    assert await read_frames(response, 1) == [PING_COMMENT]
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_after_last_event_id(
+    mocker, session: AsyncSession
+):
+    changes_crud = TaskCRUD(
+        Task, manager=mocker.AsyncMock(), changes=TaskChangeCRUD()
+    )
+    for number in range(3):
+        await changes_crud.create(
+            data={'name': f'задача {number}', 'description': 'описание'},
+            session=session,
+        )
+    changes = await changes_crud.changes.get_since(session, 0)
+    manager = ConnectionManager(queue_size=10, ping_interval=0)
+
+    response = await subscribe(
+        manager,
+        since=0,
+        last_event_id=changes[0]['seq'],
+        changes=changes_crud.changes,
+        session=session,
+    )
+    frames = [parse(frame) for frame in await read_frames(response, 2)]
+
+    assert [frame['id'] for frame in frames] == [
+        str(change['seq']) for change in changes[1:]
+    ]
+    assert [frame['data']['data']['name'] for frame in frames] == [
+        change['data']['name'] for change in changes[1:]
+    ]
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_stream_closed_with_manager():
+    manager = ConnectionManager(queue_size=10, ping_interval=0)
+    response = await subscribe(manager)
+
+    manager.close_all()
+
+    assert await read_frames(response, 1) == []
+    assert manager.stats()['connections'] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_rejected_over_limit():
+    manager = ConnectionManager(
+        queue_size=10, ping_interval=0, max_connections_per_ip=1
+    )
+    await subscribe(manager)
+
+    with pytest.raises(HTTPException) as error:
+        await subscribe(manager)
+
+    assert error.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_json_ping_only_for_stream_without_idle_timeout():
+    manager = ConnectionManager(
+        queue_size=10, ping_interval=0.01, idle_timeout=0
+    )
+    client = FakeWebSocket()
+    manager.add_connection(client)
+    response = await subscribe(manager)
+
+    assert await read_frames(response, 1) == [PING_COMMENT]
+    await asyncio.sleep(0.02)
+
+    assert client.messages == []
+    manager.close_all()
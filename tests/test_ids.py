@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+from app.core import ids
+from app.core.ids import uuid7
+
+
+def test_uuid7_layout():
+    before = time.time_ns() // 1_000_000
+    pk = uuid7()
+    after = time.time_ns() // 1_000_000
+
+    assert pk.version == 7
+    assert pk.variant == 'specified in RFC 4122'
+    assert before <= pk.int >> 80 <= after
+
+
+def test_uuid7_time_ordered():
+    keys = []
+    for _ in range(5):
+        keys.append(uuid7())
+        time.sleep(0.002)
+
+    assert keys == sorted(keys)
+    assert [str(pk) for pk in keys] == sorted(str(pk) for pk in keys)
+
+
+@pytest.mark.asyncio
+async def test_create_task_with_uuid7(monkeypatch, client, task_url):
+    monkeypatch.setattr(ids.settings, 'id_generator', 'uuid7')
+
+    result = await client.post(
+        task_url, json={'name': 'Задача', 'description': 'Описание'}
+    )
+    assert result.status_code == 201
+
+    result = await client.get(f'{task_url}{result.json()["id"]}')
+    assert result.status_code == 200
+    assert result.json()['id'][14] == '7'
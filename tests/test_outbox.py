@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.outbox import OutboxDispatcher
+from app.crud.task_changes import TaskChangeCRUD
+from app.crud.task_manager import Task, TaskCRUD
+
+
+@pytest_asyncio.fixture
+async def outbox(engine, session: AsyncSession):
+    dispatcher = OutboxDispatcher(
+        async_sessionmaker(engine, expire_on_commit=False),
+        TaskChangeCRUD(),
+        batch_size=2,
+        poll_interval=10,
+    )
+    yield dispatcher
+    await dispatcher.stop()
+
+
+@pytest.fixture
+def outbox_crud(mocker, outbox: OutboxDispatcher):
+    return TaskCRUD(
+        Task,
+        manager=mocker.AsyncMock(),
+        changes=outbox.changes,
+        outbox=outbox,
+    )
+
+
+def task_data(number: int) -> dict:
+    return {'name': f'задача {number}', 'description': 'описание'}
+
+
+@pytest.mark.asyncio
+async def test_request_only_commits_and_dispatcher_delivers(
+    session: AsyncSession,
+    outbox: OutboxDispatcher,
+    outbox_crud: TaskCRUD,
+):
+    published = []
+
+    async def publish(message):
+        published.append(message)
+
+    await outbox.start(publish)
+    for number in range(3):
+        await outbox_crud.create(data=task_data(number), session=session)
+    await asyncio.sleep(0.05)
+
+    outbox_crud.connection_manager.broadcast.assert_not_called()
+    assert [message['data']['name'] for message in published] == [
+        task_data(number)['name'] for number in range(3)
+    ]
+    assert outbox.stats()['dispatched'] == 3
+    assert await outbox.changes.get_undispatched(session, limit=10) == []
+
+    #  Клиенты получают задачу целиком, журнал хранит ее без описания.
+    assert published[0]['data']['description'] == 'описание'
+    stored = await outbox.changes.get_since(session, 0)
+    assert stored[0]['data'] == {
+        **{
+            key: published[0]['data'][key]
+            for key in ('id', 'name', 'status', 'updated_at')
+        },
+        'truncated': True,
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_redelivered(
+    session: AsyncSession,
+    outbox: OutboxDispatcher,
+    outbox_crud: TaskCRUD,
+):
+    published, failures = [], [RuntimeError('шина недоступна')]
+
+    async def publish(message):
+        published.append(message['seq'])
+        if failures:
+            raise failures.pop()
+
+    await outbox_crud.create(data=task_data(0), session=session)
+    await outbox.start(publish)
+    await asyncio.sleep(0.05)
+    assert outbox.stats()['errors'] == 1
+
+    outbox.notify()
+    await asyncio.sleep(0.05)
+
+    assert len(published) == 2 and published[0] == published[1]
+    assert outbox.stats()['dispatched'] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_outbox(
+    session: AsyncSession,
+    outbox: OutboxDispatcher,
+):
+    published = []
+
+    async def publish(message):
+        published.append(message)
+
+    await outbox.start(publish)
+    await asyncio.sleep(0)
+    await outbox.changes.append(session, 'task_deleted', {'id': '1'})
+    await session.commit()
+    await outbox.stop()
+
+    assert [message['event'] for message in published] == ['task_deleted']
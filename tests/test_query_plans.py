@@ -0,0 +1,143 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.crud.task_manager import TaskCRUD
+from app.schemas.filters import TaskFilter
+from app.schemas.pagination import Pagination, decode_cursor
+
+PLANNED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+
+@pytest.fixture
+def captured_queries(engine: AsyncEngine):
+    queries = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(PLANNED_STATEMENTS):
+            queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    yield queries
+    event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+
+
+@pytest_asyncio.fixture
+async def explain(engine: AsyncEngine):
+    """Возвращает план запроса в виде списка строк."""
+
+    async def _explain(statement: str, parameters) -> list:
+        async with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                result = await conn.exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters
+                )
+                return [row[-1] for row in result]
+
+            #  На маленькой таблице postgres всегда выбирает seq scan,
+            #  поэтому он запрещается, пока есть подходящий индекс.
+            await conn.exec_driver_sql('SET enable_seqscan = off')
+            result = await conn.exec_driver_sql(
+                f'EXPLAIN {statement}', parameters
+            )
+            return [row[0] for row in result]
+
+    return _explain
+
+
+def is_full_scan(plan: list, index_scan_allowed: bool = False) -> bool:
+    """Проверяет, читает ли план всю таблицу или весь индекс."""
+
+    for line in plan:
+        if 'Seq Scan on task' in line or line == 'SCAN task':
+            return True
+        #  Полный проход по индексу допустим только для списка без
+        #  фильтров, где он заменяет сортировку.
+        if line.startswith('SCAN task') and not index_scan_allowed:
+            return True
+    return False
+
+
+def is_sorted_in_memory(plan: list) -> bool:
+    return any(
+        'TEMP B-TREE FOR ORDER BY' in line or line.lstrip().startswith('Sort')
+        for line in plan
+    )
+
+
+async def assert_uses_indexes(
+    captured_queries, explain, ordered=True, index_scan_allowed=False
+):
+    assert captured_queries
+    for statement, parameters in captured_queries:
+        plan = await explain(statement, parameters)
+        assert not is_full_scan(plan, index_scan_allowed), (statement, plan)
+        if ordered:
+            assert not is_sorted_in_memory(plan), (statement, plan)
+
+
+@pytest_asyncio.fixture
+async def tasks(create_task, task_crud: TaskCRUD, session: AsyncSession):
+    tasks = [await create_task() for _ in range(4)]
+    for task in tasks[:2]:
+        await task_crud.update(task.id, {'status': 'В работе'}, session)
+    return tasks
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'filters',
+    [None, TaskFilter(status='В работе'), TaskFilter(status='Создано')],
+)
+async def test_list_page_plan(
+    tasks, session, task_crud, captured_queries, explain, filters
+):
+    _, next_cursor = await task_crud.get_page(
+        session, filters, Pagination(limit=1)
+    )
+    await task_crud.get_page(
+        session,
+        filters,
+        Pagination(limit=1, cursor=decode_cursor(next_cursor)),
+    )
+
+    await assert_uses_indexes(
+        captured_queries, explain, index_scan_allowed=filters is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_name_filter_plan(
+    tasks, session, task_crud, captured_queries, explain
+):
+    items, _ = await task_crud.get_page(
+        session, TaskFilter(name=tasks[1].name)
+    )
+    assert [item.id for item in items] == [tasks[1].id]
+    await task_crud.get_taken_names(session, [task.name for task in tasks])
+
+    #  Имя уникально, поэтому сортировка результата тривиальна.
+    await assert_uses_indexes(captured_queries, explain, ordered=False)
+    plan = await explain(*captured_queries[0])
+    assert any('ix_task_name_lower' in line for line in plan), plan
+
+
+@pytest.mark.asyncio
+async def test_name_filter_ignores_case(tasks, session, task_crud):
+    items, _ = await task_crud.get_page(
+        session, TaskFilter(name=tasks[1].name.upper())
+    )
+
+    assert [item.id for item in items] == [tasks[1].id]
+
+
+@pytest.mark.asyncio
+async def test_single_task_plan(
+    tasks, session, task_crud, captured_queries, explain
+):
+    await task_crud.get_or_404(session, tasks[0].id)
+    await task_crud.update(tasks[1].id, {'status': 'Завершено'}, session)
+    await task_crud.delete(tasks[2].id, session)
+
+    await assert_uses_indexes(captured_queries, explain, ordered=False)
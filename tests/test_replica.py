@@ -0,0 +1,169 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, status
+from httpx import AsyncClient
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.replica import TaskReplica, get_task_replica
+from app.crud.task_manager import Task, TaskCRUD
+from app.schemas.filters import TaskFilter
+from app.schemas.pagination import Pagination, decode_cursor
+
+
+@pytest_asyncio.fixture
+async def replica(session: AsyncSession) -> TaskReplica:
+    replica = TaskReplica()
+    await replica.load(session)
+    return replica
+
+
+@pytest.fixture
+def replica_crud(task_crud: TaskCRUD, replica: TaskReplica) -> TaskCRUD:
+    return TaskCRUD(
+        Task, manager=task_crud.connection_manager, replica=replica
+    )
+
+
+async def collect_pages(crud, session, filters, limit=2):
+    items, pagination = [], Pagination(limit=limit)
+    while True:
+        page, next_cursor = await crud.get_page(session, filters, pagination)
+        items.extend(str(task.id) for task in page)
+        if not next_cursor:
+            return items
+        pagination = Pagination(
+            limit=limit, cursor=decode_cursor(next_cursor)
+        )
+
+
+@pytest.mark.asyncio
+async def test_replica_in_sync_after_mutations(
+    session, replica, replica_crud, task_crud
+):
+    tasks = [
+        await replica_crud.create(
+            {'name': f'Задача {number}', 'description': 'Д'}, session
+        )
+        for number in range(5)
+    ]
+    await replica_crud.update(tasks[0].id, {'status': 'В работе'}, session)
+    await replica_crud.update(tasks[1].id, {'name': 'New name'}, session)
+    await replica_crud.delete(tasks[2].id, session)
+    await replica_crud.bulk_create(
+        [{'name': 'Пакет', 'description': 'Д'}], session
+    )
+    await replica_crud.bulk_update_status(
+        session, 'В работе', ids=[tasks[3].id, tasks[4].id]
+    )
+    await replica_crud.bulk_delete(session, ids=[tasks[4].id])
+
+    report = await replica.verify(session)
+    assert report['consistent'], report
+    assert len(replica) == 4
+
+    for filters in (
+        None,
+        TaskFilter(status='В работе'),
+        TaskFilter(status='Создано'),
+        #  lower() в sqlite меняет регистр только латиницы.
+        TaskFilter(name='New name'),
+        TaskFilter(name='new name'),
+    ):
+        assert await collect_pages(
+            replica_crud, session, filters
+        ) == await collect_pages(task_crud, session, filters)
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_without_db(
+    session, create_task, replica, replica_crud, engine: AsyncEngine
+):
+    task = await create_task(name='Задача')
+    await replica.load(session)
+
+    queries = []
+
+    def capture(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        record = await replica_crud.get_or_404(session, task.id)
+        items, _ = await replica_crud.get_page(session)
+        taken = await replica_crud.get_taken_names(session, ['ЗАДАЧА', 'Нет'])
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+
+    assert queries == []
+    assert record.name == 'Задача'
+    assert [item.id for item in items] == [task.id]
+    assert taken == {'задача'}
+
+
+@pytest.mark.asyncio
+async def test_replica_verify_detects_drift(session, create_task, replica):
+    task = await create_task()
+    report = await replica.verify(session)
+
+    assert not report['consistent']
+    assert report['missing'] == [str(task.id)]
+
+
+@pytest.mark.asyncio
+async def test_failed_update_checks_db_not_replica(
+    session, create_task, replica, replica_crud
+):
+    task = await create_task()
+    await replica.load(session)
+    await session.execute(delete(Task).where(Task.id == task.id))
+    await session.commit()
+
+    with pytest.raises(HTTPException) as error:
+        await replica_crud.update(task.id, {'status': 'Завершено'}, session)
+
+    assert error.value.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'event_bus, web_concurrency', [('postgres', 1), ('memory', 2)]
+)
+async def test_replica_refused_with_several_processes(
+    monkeypatch, event_bus, web_concurrency
+):
+    from app.main import app, lifespan, settings
+
+    monkeypatch.setattr(settings, 'task_replica', True)
+    monkeypatch.setattr(settings, 'event_bus', event_bus)
+    monkeypatch.setattr(settings, 'web_concurrency', web_concurrency)
+
+    with pytest.raises(RuntimeError):
+        async with lifespan(app):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_replica_api(
+    client: AsyncClient, task_url: str, session, create_task, replica
+):
+    from app.main import app
+
+    task = await create_task()
+    await replica.load(session)
+    app.dependency_overrides[get_task_replica] = lambda: replica
+
+    result = await client.get(f'{task_url}{task.id}')
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json()['name'] == task.name
+
+    result = await client.post(
+        f'{task_url}import', content='{"name": "Импорт", "description": "Д"}'
+    )
+    assert result.json()['imported'] == 1
+
+    result = await client.get('http://127.0.0.1:8000/api/metrics/replica')
+    assert result.json()['consistent']
+
+    result = await client.get('http://127.0.0.1:8000/api/metrics/')
+    assert result.json()['task_replica']['size'] == 2
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.core.singleflight import SingleFlight
+from app.crud.task_manager import Task, TaskCRUD
+from app.schemas.filters import TaskFilter
+
+
+def slow_fetch(calls: list, result='результат', error=None):
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if error:
+            raise error
+        return result
+
+    return fetch
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_collapsed():
+    flights, calls = SingleFlight(), []
+
+    results = await asyncio.gather(
+        *(flights.do(('get', 1), slow_fetch(calls)) for _ in range(10))
+    )
+
+    assert results == ['результат'] * 10
+    assert len(calls) == 1
+    assert flights.stats() == {'in_flight': 0, 'leaders': 1, 'collapsed': 9}
+
+
+@pytest.mark.asyncio
+async def test_error_shared_with_followers():
+    flights, calls = SingleFlight(), []
+    fetch = slow_fetch(calls, error=ValueError('ошибка'))
+
+    results = await asyncio.gather(
+        *(flights.do(('get', 1), fetch) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_follower_retries_after_leader_cancelled():
+    flights, calls = SingleFlight(), []
+
+    leader = asyncio.create_task(flights.do(('get', 1), slow_fetch(calls)))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do(('get', 1), slow_fetch(calls)))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == 'результат'
+    assert len(calls) == 2
+    assert flights.collapsed == 0
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_new_flight():
+    flights, calls = SingleFlight(), []
+
+    first = asyncio.create_task(flights.do(('get', 1), slow_fetch(calls)))
+    await asyncio.sleep(0)
+    flights.forget(('get', 1))
+    second = asyncio.create_task(flights.do(('get', 1), slow_fetch(calls)))
+
+    await asyncio.gather(first, second)
+    assert len(calls) == 2
+    assert flights.collapsed == 0
+
+
+@pytest.mark.asyncio
+async def test_crud_reads_collapsed(
+    task_crud: TaskCRUD, create_task, engine: AsyncEngine
+):
+    task = await create_task()
+    crud = TaskCRUD(
+        Task, manager=task_crud.connection_manager, flights=SingleFlight()
+    )
+    make_session = async_sessionmaker(engine, expire_on_commit=False)
+    filters = TaskFilter(name=task.name)
+
+    async def read(coroutine_factory):
+        async with make_session() as session:
+            return await coroutine_factory(session)
+
+    queries = []
+
+    def capture(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        tasks = await asyncio.gather(
+            *(
+                read(lambda session: crud.get_or_404(session, task.id))
+                for _ in range(5)
+            )
+        )
+        pages = await asyncio.gather(
+            *(
+                read(lambda session: crud.get_page(session, filters))
+                for _ in range(5)
+            )
+        )
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+
+    assert len(queries) == 2
+    assert {fetched.name for fetched in tasks} == {task.name}
+    assert len({id(fetched) for fetched in tasks}) == 5
+    assert all(items[0].id == task.id for items, _ in pages)
+    assert crud.flights.collapsed == 8
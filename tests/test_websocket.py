@@ -0,0 +1,321 @@
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import status
+
+from app.api.endpoints import websocket
+from app.api.endpoints.websocket import (
+    ALL_TOPIC,
+    BATCH_EVENT,
+    ERROR_EVENT,
+    LAGGING_EVENT,
+    PING_EVENT,
+    SUBSCRIPTIONS_EVENT,
+    ConnectionManager,
+    ws,
+)
+from app.core.constants import TaskStatus
+from app.crud.task_changes import TaskChangeCRUD
+
+
+class FakeWebSocket:
+
+    def __init__(self, blocked: bool = False, host: str = '10.0.0.1'):
+        self.client = SimpleNamespace(host=host, port=50000)
+        self.frames = []
+        self.messages = []
+        self.incoming = asyncio.Queue()
+        self.accepted = False
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def accept(self):
+        self.accepted = True
+
+    async def receive_text(self) -> str:
+        return await self.incoming.get()
+
+    async def send_text(self, data: str):
+        await self.gate.wait()
+        self.frames.append(data)
+        self.messages.append(json.loads(data))
+
+    async def close(self, code: int, reason: str = None):
+        self.closed_with = code
+
+
+def connect(client, manager, since=None, session=None):
+    return ws(
+        client,
+        since=since,
+        connection_manager=manager,
+        task_changes=TaskChangeCRUD(),
+        session=session or AsyncMock(),
+    )
+
+
+def event(number: int) -> dict:
+    return {'event': 'task_updated', 'data': {'id': number}}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_does_not_wait_for_slow_client():
+    manager = ConnectionManager(queue_size=10)
+    slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+    manager.add_connection(slow)
+    manager.add_connection(fast)
+
+    for number in range(5):
+        await asyncio.wait_for(manager.broadcast(event(number)), 0.1)
+    await asyncio.sleep(0)
+
+    assert fast.messages == [event(number) for number in range(5)]
+    assert slow.messages == []
+    assert manager.stats()['queued'] == 4
+
+    slow.gate.set()
+    await asyncio.sleep(0)
+    assert slow.messages == fast.messages
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_lagging_client_notified_then_recovers():
+    manager = ConnectionManager(queue_size=2)
+    slow = FakeWebSocket(blocked=True)
+    manager.add_connection(slow)
+
+    await manager.broadcast(event(0))
+    await asyncio.sleep(0)
+    for number in range(1, 4):
+        await manager.broadcast(event(number))
+
+    slow.gate.set()
+    await asyncio.sleep(0)
+
+    assert slow.messages == [
+        event(0),
+        {'event': LAGGING_EVENT, 'data': {'dropped': 2}},
+        event(3),
+    ]
+    assert manager.stats()['lagging'] == 0
+    assert manager.stats()['dropped'] == 2
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_client_disconnected_if_still_lagging():
+    manager = ConnectionManager(queue_size=2)
+    slow = FakeWebSocket(blocked=True)
+    manager.add_connection(slow)
+
+    await manager.broadcast(event(0))
+    await asyncio.sleep(0)
+    for number in range(1, 6):
+        await manager.broadcast(event(number))
+    await asyncio.sleep(0)
+
+    assert slow not in manager.active_connections
+    assert slow.closed_with == status.WS_1013_TRY_AGAIN_LATER
+    assert manager.stats()['slow_disconnects'] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_send_removes_client():
+    manager = ConnectionManager(queue_size=2)
+    broken = FakeWebSocket()
+
+    async def send_text(data):
+        raise RuntimeError('соединение закрыто')
+
+    broken.send_text = send_text
+    manager.add_connection(broken)
+
+    await manager.broadcast(event(0))
+    await asyncio.sleep(0)
+
+    assert manager.active_connections == {}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_encodes_once(mocker):
+    manager = ConnectionManager(queue_size=10)
+    clients = [FakeWebSocket() for _ in range(3)]
+    for client in clients:
+        manager.add_connection(client)
+    encode = mocker.spy(websocket, 'encode_message')
+
+    await manager.broadcast({'event': 'task_updated', 'data': {'id': 'Ё'}})
+    await asyncio.sleep(0)
+
+    encode.assert_called_once()
+    assert clients[0].frames[0] is clients[1].frames[0]
+    assert clients[2].messages == [
+        {'event': 'task_updated', 'data': {'id': 'Ё'}}
+    ]
+    manager.close_all()
+
+
+def subscribe(manager, client, **topics):
+    manager.handle_message(
+        client, json.dumps({'action': 'subscribe', **topics})
+    )
+
+
+@pytest.mark.asyncio
+async def test_subscribed_client_gets_only_matching_events():
+    manager = ConnectionManager(queue_size=10)
+    by_id, by_status, everything = (FakeWebSocket() for _ in range(3))
+    for client in (by_id, by_status, everything):
+        manager.add_connection(client)
+    pk = str(uuid.uuid4())
+    subscribe(manager, by_id, ids=[pk.upper()])
+    subscribe(manager, by_status, statuses=['Завершено'])
+
+    updated = {
+        'event': 'task_updated',
+        'data': {'id': pk, 'status': TaskStatus.IN_PROGRESS},
+    }
+    completed = {
+        'event': 'tasks_updated',
+        'data': {'ids': ['другая'], 'status': 'Завершено'},
+    }
+    imported = {'event': 'tasks_imported', 'data': {'count': 1}}
+    for message in (updated, completed, imported):
+        await manager.broadcast(message)
+    await asyncio.sleep(0)
+
+    assert by_id.messages[0] == {
+        'event': SUBSCRIPTIONS_EVENT,
+        'data': {'id': [pk]},
+    }
+    assert by_id.messages[1:] == [json.loads(json.dumps(updated)), imported]
+    assert by_status.messages[1:] == [completed, imported]
+    assert len(everything.messages) == 3
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_all_restores_every_event():
+    manager = ConnectionManager(queue_size=10)
+    client = FakeWebSocket()
+    manager.add_connection(client)
+    subscribe(manager, client, events=['task_deleted'])
+
+    await manager.broadcast(event(0))
+    manager.handle_message(client, '{"action": "unsubscribe"}')
+    await manager.broadcast(event(1))
+    await asyncio.sleep(0)
+
+    assert client.messages == [
+        {'event': SUBSCRIPTIONS_EVENT, 'data': {'event': ['task_deleted']}},
+        {'event': SUBSCRIPTIONS_EVENT, 'data': {}},
+        event(1),
+    ]
+    manager.close_connection(client)
+    assert manager.subscribers == {}
+
+
+@pytest.mark.asyncio
+async def test_invalid_subscription_message_answered_with_error():
+    manager = ConnectionManager(queue_size=10)
+    client = FakeWebSocket()
+    manager.add_connection(client)
+
+    subscribe(manager, client, statuses=['Неизвестно'])
+    manager.handle_message(client, 'не json')
+    await asyncio.sleep(0)
+
+    assert [message['event'] for message in client.messages] == [
+        ERROR_EVENT,
+        ERROR_EVENT,
+    ]
+    assert client in manager.subscribers[ALL_TOPIC]
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_events_coalesced_into_one_batch_per_window():
+    manager = ConnectionManager(queue_size=10, batch_window=0.01)
+    client = FakeWebSocket()
+    manager.add_connection(client)
+
+    await manager.broadcast(
+        {'event': 'task_created', 'data': {'id': '1', 'name': 'старое'}}
+    )
+    for number in range(1000):
+        await manager.broadcast(
+            {'event': 'task_updated', 'data': {'id': '1', 'name': number}}
+        )
+    await manager.broadcast(event(2))
+    await manager.broadcast({'event': 'tasks_deleted', 'data': {'ids': ['3']}})
+    await asyncio.sleep(0.02)
+
+    assert client.messages == [
+        {
+            'event': BATCH_EVENT,
+            'data': [
+                {'event': 'task_created', 'data': {'id': '1', 'name': 999}},
+                event(2),
+                {'event': 'tasks_deleted', 'data': {'ids': ['3']}},
+            ],
+        }
+    ]
+    assert manager.stats()['batches'] == 1
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_connections_over_cap_rejected_before_accept():
+    manager = ConnectionManager(max_connections=3, max_connections_per_ip=2)
+    first, second = FakeWebSocket(), FakeWebSocket()
+    manager.add_connection(first, '10.0.0.1')
+    manager.add_connection(second, '10.0.0.1')
+
+    same_ip = FakeWebSocket(host='10.0.0.1')
+    await connect(same_ip, manager)
+    manager.add_connection(FakeWebSocket(), '10.0.0.2')
+    other_ip = FakeWebSocket(host='10.0.0.3')
+    await connect(other_ip, manager)
+
+    assert not same_ip.accepted and not other_ip.accepted
+    assert same_ip.closed_with == status.WS_1013_TRY_AGAIN_LATER
+    assert manager.stats()['rejected'] == 2
+
+    manager.close_connection(first)
+    assert manager.admit('10.0.0.1') is None
+    assert manager.connections_per_ip == {'10.0.0.1': 1, '10.0.0.2': 1}
+    manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_idle_client_disconnected_unless_it_answers_ping():
+    manager = ConnectionManager(ping_interval=0.01, idle_timeout=0.05)
+    silent, alive = FakeWebSocket(), FakeWebSocket(host='10.0.0.2')
+
+    async def answer_pings():
+        while alive.client is not None:
+            await asyncio.sleep(0.01)
+            if any(m['event'] == PING_EVENT for m in alive.messages):
+                alive.messages.clear()
+                alive.incoming.put_nowait('{"action": "pong"}')
+
+    answering = asyncio.create_task(answer_pings())
+    await asyncio.wait_for(connect(silent, manager), 1)
+    connected = asyncio.create_task(connect(alive, manager))
+    await asyncio.sleep(0.15)
+
+    assert silent.closed_with == status.WS_1001_GOING_AWAY
+    assert silent not in manager.active_connections
+    assert alive in manager.active_connections
+    assert manager.stats()['idle_disconnects'] == 1
+
+    connected.cancel()
+    answering.cancel()
+    manager.close_all()